@@ -2,36 +2,269 @@
 """
 Lockr Configuration File
 Customize these settings to match your environment
+
+Any setting can be overridden with a LOCKR_<NAME> environment variable
+(e.g. LOCKR_WEB_PORT=8080). Under systemd, the SSH key, vault key and admin
+password can also come from LoadCredential= (see _CREDENTIALS). Settings are
+resolved on first access, so importing this module performs no filesystem I/O.
 """
 
 import os
+import threading
+import types
+
+_DEFAULTS = {
+    # SSH Configuration
+    "SSH_KEY_PATH": "/home/brian/.ssh/id_ed25519",  # Your private SSH key path
+    "SSH_USER": "brian",  # Your SSH username
+
+    # Ansible Vault Configuration
+    "VAULT_DIR": "/home/brian/playbooks/vault",  # Directory for storing encrypted passwords
+    "VAULT_KEY": "/home/brian/playbooks/.vault_key",  # Path to your vault key file
+    "ANSIBLE_VAULT_CMD": "ansible-vault",  # Ansible vault command (used when VAULT_BACKEND is "ansible-vault")
+    "VAULT_BACKEND": "cryptography",  # "cryptography" (in-process) or "ansible-vault" (subprocess)
+    "VAULT_KDF_ITERATIONS": 10000,  # PBKDF2 rounds - must match the Ansible Vault 1.1 format
+    "VAULT_CACHE_SIZE": 256,  # Decrypted vault files kept in memory (keyed by path + mtime)
+    "VAULT_CACHE_TTL": 60,  # Seconds a decrypted password stays cached (0 disables the cache)
+
+    # Server Management
+    "SERVERS_FILE": "/home/brian/playbooks/servers.json",  # File to store server information
+    "SERVERS_JSON_BACKEND": "orjson",  # "orjson" (falls back to "json" if not installed) or "json"
+    "SERVERS_REFRESH_S": 2,  # Seconds a worker serves its in-memory server list before re-checking the file
+
+    # Web Interface
+    "WEB_HOST": "0.0.0.0",  # Host to bind to (0.0.0.0 for all interfaces)
+    "WEB_PORT": 5000,  # Port to run on
+    "WEB_DEBUG": True,  # Debug mode (set to False in production)
+    "WEB_WORKERS": 2,  # Gunicorn worker processes (see gunicorn_conf.py)
+    "WEB_WORKER_CLASS": "gthread",  # Gunicorn worker type: "sync", "gthread" or "gevent" (pip install gevent)
+    "WEB_THREADS": 8,  # Threads per gthread worker - requests mostly wait on SSH, not the CPU
+    "WEB_TIMEOUT": 120,  # Seconds before gunicorn recycles a busy worker (must exceed SCRIPT_TIMEOUT)
+    "WEB_PRELOAD_APP": True,  # Load the app once in the gunicorn master and fork workers from it (not with gevent)
+    "LOG_LEVEL": "INFO",  # Application and gunicorn log level: DEBUG, INFO, WARNING or ERROR
+    "AUDIT_QUEUE_SIZE": 10000,  # Audit entries buffered per worker before new ones are dropped
+    "AUDIT_LOG_FILE": "",  # Also append audit entries here as JSON lines ("" = application log only)
+
+    # Authentication (for development - change in production)
+    "DEFAULT_USERNAME": "admin",
+    "DEFAULT_PASSWORD": "admin123",
+    "ADMIN_PASSWORD_FILE": "/home/brian/playbooks/.lockr_admin",  # Hash written by "change admin password"; replaces DEFAULT_PASSWORD once present
+
+    # Timeouts
+    "SSH_TIMEOUT": 15,  # SSH connection timeout in seconds
+    "SCRIPT_TIMEOUT": 60,  # Script execution timeout in seconds
+    "PING_TIMEOUT": 5,  # Ping timeout in seconds
+    "PING_FALLBACK": True,  # Fork the ping binary when no TCP port answers and in-process ICMP is not permitted
+    "CONNECTIVITY_CACHE_TTL": 5,  # Seconds a host's reachability result is reused (0 disables, ?fresh=1 bypasses)
+    "HEALTH_CACHE_TTL": 5,  # Seconds a server's health check result is reused (0 disables, ?fresh=1 bypasses)
+    "USER_CACHE_TTL": 60,  # Seconds a "user exists on server" answer is reused (0 disables, {"fresh": true} bypasses)
+
+    # SSH connection pool
+    "SSH_POOL_MAX": 8,  # Cached SSH connections per worker (keep below sshd MaxStartups)
+    "SSH_POOL_IDLE_S": 300,  # Close pooled connections unused for this many seconds
+    "SSH_KEEPALIVE_S": 30,  # Keepalive interval for pooled connections (0 disables)
+    "CHECK_WORKERS": 16,  # Servers checked concurrently by dashboard and health checks
+}
+
+# systemd credentials (LoadCredential=) used when $CREDENTIALS_DIRECTORY is set:
+# setting -> (credential name, True to use the file's path, False to use its contents)
+_CREDENTIALS = {
+    "SSH_KEY_PATH": ("lockr_ssh_key", True),
+    "VAULT_KEY": ("lockr_vault_key", True),
+    "DEFAULT_PASSWORD": ("lockr_admin_password", False),
+}
+
+
+def _credential(name):
+    """Return a systemd credential for a setting, or None if it was not provided"""
+    cred_dir = os.environ.get("CREDENTIALS_DIRECTORY")
+    if not cred_dir or name not in _CREDENTIALS:
+        return None
+    cred_name, as_path = _CREDENTIALS[name]
+    path = os.path.join(cred_dir, cred_name)
+    if not os.path.isfile(path):
+        return None
+    if as_path:
+        return path
+    with open(path, "r") as f:
+        return f.read().rstrip("\n")
+
+
+def _default_password_hash():
+    """Hash DEFAULT_PASSWORD once so logins only verify (LOCKR_DEFAULT_PASSWORD_HASH skips hashing)"""
+    preset = os.environ.get("LOCKR_DEFAULT_PASSWORD_HASH")
+    if preset:
+        return preset
+    from werkzeug.security import generate_password_hash
+    return generate_password_hash(_get("DEFAULT_PASSWORD"))
+
+
+def _timeouts_ns():
+    """Timeouts in integer nanoseconds, for time.monotonic_ns() deadlines"""
+    return types.MappingProxyType({
+        "ssh": _get("SSH_TIMEOUT") * 10**9,
+        "script": _get("SCRIPT_TIMEOUT") * 10**9,
+        "ping": _get("PING_TIMEOUT") * 10**9,
+    })
+
+
+# Settings computed from other settings (resolved once, like the defaults above)
+_DERIVED = {
+    "SERVERS_DIR": lambda: os.path.dirname(_get("SERVERS_FILE")),  # Directory holding SERVERS_FILE
+    "JOBS_DIR": lambda: os.path.join(os.path.dirname(_get("SERVERS_FILE")), "lockr_jobs"),  # Background job status files, shared by all workers
+    "DEFAULT_PASSWORD_HASH": _default_password_hash,  # Werkzeug hash of DEFAULT_PASSWORD
+    # Flask's reloader re-imports everything on each save; LOCKR_RELOAD=0 keeps debug without it.
+    # Never under systemd ($INVOCATION_ID): the reloader serves from a child, so $MAINPID would miss SIGHUP
+    "WEB_USE_RELOADER": lambda: (_get("WEB_DEBUG") and os.environ.get("LOCKR_RELOAD", "1") == "1"
+                                 and "INVOCATION_ID" not in os.environ),
+    "TIMEOUTS_NS": _timeouts_ns,  # Read-only {"ssh", "script", "ping"} -> nanoseconds
+}
+
+__all__ = list(_DEFAULTS) + list(_DERIVED) + ["ensure_dirs", "get_ssh_pkey", "reset_ssh_pkey", "validate_config"]
+
+
+# Overrides that could not be converted: setting -> message (reported by validate_config())
+_COERCE_ERRORS = {}
+
+_TRUE = ("1", "true", "yes", "on")
+_FALSE = ("0", "false", "no", "off", "")
+
+
+def _coerce(name, raw, default):
+    """Convert an override to the type of its default, keeping the default and recording an error if it cannot be"""
+    if isinstance(default, bool):
+        word = raw.strip().lower()
+        if word in _TRUE or word in _FALSE:
+            return word in _TRUE
+        _COERCE_ERRORS[name] = f"{name} must be a boolean (1/0, true/false, yes/no, on/off), got {raw!r}"
+        return default
+    if isinstance(default, int):
+        try:
+            return int(raw)
+        except ValueError:
+            _COERCE_ERRORS[name] = f"{name} must be an integer, got {raw!r}"
+            return default
+    return raw
+
+
+def __getattr__(name):
+    """Resolve a setting on first access and cache it as a module global"""
+    if name in _DERIVED:
+        value = _DERIVED[name]()
+        globals()[name] = value
+        return value
+    if name not in _DEFAULTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    default = _DEFAULTS[name]
+    raw = os.environ.get(f"LOCKR_{name}")
+    if raw is None:
+        raw = _credential(name)
+    value = default if raw is None else _coerce(name, raw, default)
+    globals()[name] = value
+    return value
+
+
+def _get(name):
+    """Module-internal accessor (PEP 562 __getattr__ is not used for bare names)"""
+    try:
+        return globals()[name]
+    except KeyError:
+        return __getattr__(name)
+
+
+# Allowed values and ranges checked by validate_config()
+_CHOICES = {
+    "VAULT_BACKEND": ("cryptography", "ansible-vault"),
+    "SERVERS_JSON_BACKEND": ("orjson", "json"),
+    "WEB_WORKER_CLASS": ("sync", "gthread", "gevent"),
+    "LOG_LEVEL": ("DEBUG", "INFO", "WARNING", "ERROR"),
+}
+_RANGES = {
+    "WEB_PORT": (1, 65535),
+    "WEB_WORKERS": (1, 256),
+    "WEB_THREADS": (1, 256),
+    "WEB_TIMEOUT": (1, None),
+    "VAULT_KDF_ITERATIONS": (1, None),
+    "VAULT_CACHE_SIZE": (0, None),
+    "VAULT_CACHE_TTL": (0, None),
+    "SERVERS_REFRESH_S": (0, None),
+    "SSH_TIMEOUT": (1, None),
+    "SCRIPT_TIMEOUT": (1, None),
+    "PING_TIMEOUT": (1, None),
+    "CONNECTIVITY_CACHE_TTL": (0, None),
+    "HEALTH_CACHE_TTL": (0, None),
+    "USER_CACHE_TTL": (0, None),
+    "SSH_POOL_MAX": (1, None),
+    "SSH_POOL_IDLE_S": (0, None),
+    "SSH_KEEPALIVE_S": (0, None),
+    "CHECK_WORKERS": (1, 256),
+    "AUDIT_QUEUE_SIZE": (1, None),
+}
+
+
+def validate_config(check_paths=True):
+    """Raise ValueError listing every invalid setting (LOCKR_SKIP_PATH_CHECK=1 skips file checks)"""
+    errors = []
+    for name in _DEFAULTS:
+        _get(name)  # resolve every override so each malformed one is reported, not just those used so far
+        if name in _COERCE_ERRORS:
+            errors.append(_COERCE_ERRORS[name])
+    for name, allowed in _CHOICES.items():
+        if _get(name) not in allowed:
+            errors.append(f"{name} must be one of {', '.join(allowed)}, got {_get(name)!r}")
+    for name, (low, high) in _RANGES.items():
+        value = _get(name)
+        if isinstance(value, int) and (value < low or (high is not None and value > high)):
+            errors.append(f"{name} out of range: {value}")
+
+    if isinstance(_get("WEB_TIMEOUT"), int) and _get("WEB_TIMEOUT") <= _get("SCRIPT_TIMEOUT"):
+        errors.append("WEB_TIMEOUT must be greater than SCRIPT_TIMEOUT")
+    # gevent workers load the app themselves (no preload), so each would sign sessions with its own key
+    if _get("WEB_WORKER_CLASS") == "gevent" and _get("WEB_WORKERS") != 1:
+        errors.append("WEB_WORKERS must be 1 with the gevent worker class")
+
+    if check_paths and os.environ.get("LOCKR_SKIP_PATH_CHECK") != "1":
+        for name in ("SSH_KEY_PATH", "VAULT_KEY"):
+            if not os.path.isfile(_get(name)):
+                errors.append(f"{name} not found: {_get(name)}")
+
+    if errors:
+        raise ValueError("Invalid Lockr configuration: " + "; ".join(errors))
+
 
-# SSH Configuration
-SSH_KEY_PATH = "/home/brian/.ssh/id_ed25519"  # Your private SSH key path
-SSH_USER = "brian"  # Your SSH username
+def ensure_dirs():
+    """Ensure required directories exist - call before writing vault or server files"""
+    for directory in (_get("VAULT_DIR"), _get("SERVERS_DIR")):
+        if not os.path.isdir(directory):
+            os.makedirs(directory, exist_ok=True)
 
-# Ansible Vault Configuration
-VAULT_DIR = "/home/brian/playbooks/vault"  # Directory for storing encrypted passwords
-VAULT_KEY = "/home/brian/playbooks/.vault_key"  # Path to your vault key file
-ANSIBLE_VAULT_CMD = "ansible-vault"  # Ansible vault command
 
-# Server Management
-SERVERS_FILE = "/home/brian/playbooks/servers.json"  # File to store server information
+# (key file version, parsed key) for SSH_KEY_PATH
+_PKEY = None
+_PKEY_LOCK = threading.Lock()
 
-# Web Interface
-WEB_HOST = "0.0.0.0"  # Host to bind to (0.0.0.0 for all interfaces)
-WEB_PORT = 5000  # Port to run on
-WEB_DEBUG = True  # Debug mode (set to False in production)
 
-# Authentication (for development - change in production)
-DEFAULT_USERNAME = "admin"
-DEFAULT_PASSWORD = "admin123"
+def get_ssh_pkey():
+    """Return the parsed SSH_KEY_PATH key, shared by every connection until the file changes"""
+    global _PKEY
+    path = _get("SSH_KEY_PATH")
+    # One stat per new connection; a rotated key is picked up even by workers forked from a process
+    # that already parsed the old one (gunicorn HUP with preload_app)
+    st = os.stat(path)
+    version = (path, st.st_ino, st.st_mtime_ns, st.st_size)
+    cached = _PKEY
+    if cached is None or cached[0] != version:
+        # Concurrent first requests wait for one parse instead of each reading the file
+        with _PKEY_LOCK:
+            if _PKEY is None or _PKEY[0] != version:
+                import paramiko
+                _PKEY = (version, paramiko.Ed25519Key.from_private_key_file(path))
+            cached = _PKEY
+    return cached[1]
 
-# Timeouts
-SSH_TIMEOUT = 15  # SSH connection timeout in seconds
-SCRIPT_TIMEOUT = 60  # Script execution timeout in seconds
-PING_TIMEOUT = 5  # Ping timeout in seconds
 
-# Ensure required directories exist
-os.makedirs(VAULT_DIR, exist_ok=True)
-os.makedirs(os.path.dirname(SERVERS_FILE), exist_ok=True)
+def reset_ssh_pkey():
+    """Forget the loaded key so the next get_ssh_pkey() re-reads SSH_KEY_PATH"""
+    global _PKEY
+    _PKEY = None
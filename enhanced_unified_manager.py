@@ -4,21 +4,77 @@ Lockr - Enterprise Server & Password Management
 Combines password creation, Ansible Vault storage, retrieval, and server management
 """
 
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for
+from flask import Flask, render_template, request, jsonify, session, redirect, url_for, copy_current_request_context
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.security import generate_password_hash, check_password_hash
 import subprocess
 import os
 import json
+import logging
+import logging.handlers
 import secrets
 import string
 from datetime import datetime, timedelta
-import tempfile
 import shutil
+import atexit
+import queue
 import paramiko
+import selectors
+import shlex
+import signal
 import socket
+import struct
 import threading
 import time
+import binascii
+import errno
+from concurrent.futures import ThreadPoolExecutor
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from functools import lru_cache
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import hashes, hmac, padding
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+
+try:
+    import orjson
+except ImportError:
+    orjson = None  # Optional - the stdlib json module is used instead
+
+class ORJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider that encodes with orjson, producing the same output as the default provider"""
+    # Datetimes still go through Flask's default() so they keep the HTTP date format
+    option = (orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME) if orjson else 0
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        try:
+            return orjson.dumps(obj, default=self.default, option=self.option).decode()
+        except TypeError:
+            # e.g. integers wider than 64 bits
+            return super().dumps(obj)
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        option = self.option
+        if self.compact is False or (self.compact is None and self._app.debug):
+            option |= orjson.OPT_INDENT_2
+        try:
+            body = orjson.dumps(obj, default=self.default, option=option | orjson.OPT_APPEND_NEWLINE)
+        except TypeError:
+            return super().response(obj)
+        return self._app.response_class(body, mimetype=self.mimetype)
 
 app = Flask(__name__, static_folder='static')
+if orjson is not None:
+    app.json = ORJSONProvider(app)
 app.secret_key = secrets.token_hex(32)
 
 # Configure session to be more persistent
@@ -27,22 +83,19 @@ app.config['SESSION_COOKIE_SECURE'] = False  # Allow HTTP for local development
 app.config['SESSION_COOKIE_HTTPONLY'] = True
 app.config['SESSION_COOKIE_SAMESITE'] = 'Lax'
 
-# Import configuration
-try:
-    from config import *
-except ImportError:
-    # Fallback configuration if config.py is not available
-    VAULT_DIR = "/home/brian/playbooks/vault"
-    VAULT_KEY = "/home/brian/playbooks/.vault_key"
-    ANSIBLE_VAULT_CMD = "/usr/bin/ansible-vault"  # Use full path
-    SSH_KEY_PATH = "/home/brian/.ssh/id_ed25519"
-    SSH_USER = "brian"
-
-# Ensure required directories exist
-os.makedirs(VAULT_DIR, exist_ok=True)
-
-# Server storage (in production, use a database)
-SERVERS_FILE = "/home/brian/playbooks/servers.json"
+# Configuration lives in config.py (LOCKR_<NAME> overrides); the lazily hashed admin
+# password is read as config.DEFAULT_PASSWORD_HASH, so it is only computed if a login needs it
+import config
+from config import (
+    SSH_KEY_PATH, SSH_USER, SSH_TIMEOUT,
+    VAULT_DIR, VAULT_KEY, ANSIBLE_VAULT_CMD, VAULT_BACKEND, VAULT_KDF_ITERATIONS, VAULT_CACHE_SIZE, VAULT_CACHE_TTL,
+    SERVERS_FILE, SERVERS_JSON_BACKEND, SERVERS_REFRESH_S, JOBS_DIR,
+    WEB_HOST, WEB_PORT, WEB_DEBUG, WEB_USE_RELOADER, LOG_LEVEL, AUDIT_QUEUE_SIZE, AUDIT_LOG_FILE,
+    DEFAULT_USERNAME, ADMIN_PASSWORD_FILE, TIMEOUTS_NS,
+    PING_FALLBACK, CONNECTIVITY_CACHE_TTL, HEALTH_CACHE_TTL, USER_CACHE_TTL,
+    SSH_POOL_MAX, SSH_POOL_IDLE_S, SSH_KEEPALIVE_S, CHECK_WORKERS,
+    ensure_dirs, get_ssh_pkey, reset_ssh_pkey, validate_config,
+)
 
 # Mock data for demonstration (replace with actual data in production)
 MOCK_SERVERS = [
@@ -53,30 +106,210 @@ MOCK_SERVERS = [
 
 MOCK_USERS = ["root", "admin", "backup", "monitoring"]
 
-def load_servers():
-    """Load servers from JSON file"""
+# Last content read from or written to SERVERS_FILE, used to skip no-op rewrites
+_servers_file_content = None
+
+# Server name -> position in the list parsed from SERVERS_FILE (first entry wins)
+_server_positions = {}
+
+# (file_version(), servers) last parsed from SERVERS_FILE, and when the file was last checked
+_servers_snapshot = None
+_servers_checked_at = 0.0
+
+# Serializes refreshing and saving the state above, and each updating_servers() block
+_servers_lock = threading.RLock()
+
+def json_dumps(obj):
+    """Serialize obj to compact JSON bytes, with orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(',', ':')).encode()
+
+def json_loads(content):
+    """Parse JSON bytes, with orjson when it is installed"""
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+def servers_json_dumps(servers):
+    """Serialize the server list to bytes with the configured JSON backend"""
+    if orjson is not None and SERVERS_JSON_BACKEND == "orjson":
+        return orjson.dumps(servers, option=orjson.OPT_INDENT_2)
+    return json.dumps(servers, indent=2).encode()
+
+def servers_json_loads(content):
+    """Parse server list bytes with the configured JSON backend"""
+    if orjson is not None and SERVERS_JSON_BACKEND == "orjson":
+        return orjson.loads(content)
+    return json.loads(content)
+
+def index_servers(servers):
+    """Rebuild the name -> position index used by find_server()"""
+    global _server_positions
+    _server_positions = {s.get('name'): i for i, s in reversed(list(enumerate(servers)))}
+
+def file_version(path):
+    """Identify a file's current contents by inode, mtime and size"""
+    # atomic_write() swaps in a new inode, so back-to-back writes within one mtime tick still differ
+    st = os.stat(path)
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+def copy_servers(servers):
+    """Copy a server list so callers can mutate it without touching the cached snapshot"""
+    return [dict(server) for server in servers]
+
+def load_servers(fresh=False, copy=True):
+    """Load servers from JSON file (from memory, re-checking the file at most every SERVERS_REFRESH_S)"""
+    # Callers that modify and save the list pass fresh=True so they never build on a stale copy;
+    # read-only callers pass copy=False and must not mutate the shared snapshot they get back
+    servers = _load_servers_snapshot(fresh)
+    return copy_servers(servers) if copy else servers
+
+def _load_servers_snapshot(fresh):
+    snapshot = _servers_snapshot
+    if snapshot is not None and not fresh and time.monotonic() - _servers_checked_at < SERVERS_REFRESH_S:
+        return snapshot[1]
+    with _servers_lock:
+        return _refresh_servers_snapshot()
+
+def _refresh_servers_snapshot():
+    global _servers_file_content, _servers_snapshot, _servers_checked_at
+    snapshot = _servers_snapshot
+    now = time.monotonic()
     try:
-        if os.path.exists(SERVERS_FILE):
-            with open(SERVERS_FILE, 'r') as f:
-                return json.load(f)
-        else:
-            return MOCK_SERVERS
+        version = file_version(SERVERS_FILE)
+        _servers_checked_at = now
+        if snapshot is not None and snapshot[0] == version:
+            return snapshot[1]
+
+        with open(SERVERS_FILE, 'rb') as f:
+            content = f.read()
+        servers = servers_json_loads(content)
+        _servers_file_content = content
+        _servers_snapshot = (version, servers)
+        index_servers(servers)
+        return servers
+    except FileNotFoundError:
+        return MOCK_SERVERS
     except Exception as e:
-        print(f"Error loading servers: {e}")
+        app.logger.error("Error loading servers: %s", e)
         return MOCK_SERVERS
 
+def atomic_write(path, content, mode=None, durable=True):
+    """Write bytes to path via a temp file and os.replace, so readers never see a partial file"""
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        # A fresh file (never an existing one or a symlink), created with its final mode before any byte lands
+        flags = os.O_WRONLY | os.O_CREAT | os.O_EXCL | os.O_NOFOLLOW | os.O_CLOEXEC
+        with os.fdopen(os.open(tmp_path, flags, 0o666 if mode is None else mode), 'wb') as f:
+            if mode is not None:
+                os.fchmod(f.fileno(), mode)  # Exact mode, whatever the umask
+            f.write(content)
+            if durable:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+    if not durable:
+        # Metadata that is cheap to lose in a crash (timestamps, job records): no disk flush on the request path
+        return
+    # The rename itself lives in the directory; sync it too or a crash can bring back the old file
+    dir_fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
+
 def save_servers(servers):
     """Save servers to JSON file"""
+    global _servers_file_content, _servers_snapshot, _servers_checked_at
     try:
-        os.makedirs(os.path.dirname(SERVERS_FILE), exist_ok=True)
-        with open(SERVERS_FILE, 'w') as f:
-            json.dump(servers, f, indent=2)
+        content = servers_json_dumps(servers)
+        with _servers_lock:
+            if content == _servers_file_content:
+                # Dashboard loads and health checks usually leave every status unchanged
+                return True
+            
+            ensure_dirs()
+            atomic_write(SERVERS_FILE, content)
+            _servers_file_content = content
+            _servers_snapshot = (file_version(SERVERS_FILE), copy_servers(servers))
+            _servers_checked_at = time.monotonic()
+            index_servers(servers)
         return True
     except Exception as e:
-        print(f"Error saving servers: {e}")
+        app.logger.error("Error saving servers: %s", e)
         return False
 
-def perform_health_check(server_ip, server_name):
+@contextmanager
+def updating_servers():
+    """Yield a fresh copy of the server list to change and save_servers(), one block at a time per worker"""
+    # Two updates can no longer start from the same list and drop each other's change;
+    # keep SSH and network calls outside the block, other writers wait for it
+    with _servers_lock:
+        yield load_servers(fresh=True)
+
+def find_server(servers, name):
+    """Return the server entry with the given name, or None"""
+    # O(1) via the index when `servers` is the list from load_servers()/save_servers()
+    position = _server_positions.get(name)
+    if position is not None and position < len(servers) and servers[position].get('name') == name:
+        return servers[position]
+    return next((s for s in servers if s.get('name') == name), None)
+
+class TTLCache:
+    """Thread-safe mapping whose entries expire ttl seconds after they are stored (ttl 0 stores nothing)"""
+
+    def __init__(self, ttl, max_size=1024):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries = {}  # key -> (expiry (monotonic), value)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the live value for key, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            return entry[1]
+        return None
+
+    def put(self, key, value):
+        """Store value for ttl seconds, first pruning expired entries once max_size is reached"""
+        if not self.ttl:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if len(self._entries) >= self.max_size:
+                for stale in [k for k, (expiry, _) in self._entries.items() if expiry <= now]:
+                    del self._entries[stale]
+            self._entries[key] = (now + self.ttl, value)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+# (server_ip, server_name) -> result; dashboard polls within HEALTH_CACHE_TTL share one check
+_health_cache = TTLCache(HEALTH_CACHE_TTL)
+
+def perform_health_check(server_ip, server_name, fresh=False):
+    """Perform comprehensive health check on a server, reusing a result up to HEALTH_CACHE_TTL seconds old"""
+    key = (server_ip, server_name)
+    if not fresh:
+        cached = _health_cache.get(key)
+        if cached is not None:
+            return dict(cached)
+    
+    result = _perform_health_check(server_ip, server_name)
+    _health_cache.put(key, dict(result))
+    return result
+
+def _perform_health_check(server_ip, server_name):
     """Perform comprehensive health check on a server with detailed diagnostics"""
     health_results = {
         "server": server_name,
@@ -87,29 +320,38 @@ def perform_health_check(server_ip, server_name):
         "troubleshooting": []
     }
     
-    try:
-        # 1. Basic Connectivity Check
-        connectivity_result = test_connectivity_detailed(server_ip, timeout=5)
-        health_results["checks"]["connectivity"] = connectivity_result
-        
-        # 2. SSH Port Check
-        ssh_result = test_ssh_port_detailed(server_ip, 22, timeout=5)
-        health_results["checks"]["ssh_port"] = ssh_result
-        
+    def check_ssh():
         # 3. SSH Authentication Check (if we have SSH keys)
         ssh_auth_result = test_ssh_authentication_detailed(server_ip)
-        health_results["checks"]["ssh_auth"] = ssh_auth_result
         
         # 4. System Resource Check (if SSH is available)
         if ssh_auth_result["status"] == "authenticated":
             system_resources = check_system_resources_detailed(server_ip)
-            health_results["checks"]["system_resources"] = system_resources
         else:
-            health_results["checks"]["system_resources"] = {
+            system_resources = {
                 "status": "unknown",
                 "details": "Cannot check system resources without SSH access",
                 "troubleshooting": ["Fix SSH authentication first to enable system resource monitoring"]
             }
+        return ssh_auth_result, system_resources
+    
+    try:
+        # 1. Basic Connectivity Check, in the background while the SSH checks run
+        connectivity_future = shared_executor("probe").submit(test_connectivity_detailed, server_ip, timeout=5)
+        # 2. SSH Port Check
+        ssh_port_result = test_ssh_port_detailed(server_ip, 22, timeout=5)
+        
+        # 3 and 4 only run against an open port - otherwise they would just wait out their own timeouts
+        if ssh_port_result["status"] == "open":
+            ssh_auth_result, system_resources = check_ssh()
+        else:
+            ssh_auth_result = {"status": "skipped", "details": "SSH port not reachable", "troubleshooting": []}
+            system_resources = {"status": "skipped", "details": "SSH port not reachable", "troubleshooting": []}
+        
+        health_results["checks"]["connectivity"] = connectivity_future.result()
+        health_results["checks"]["ssh_port"] = ssh_port_result
+        health_results["checks"]["ssh_auth"] = ssh_auth_result
+        health_results["checks"]["system_resources"] = system_resources
         
         # Generate troubleshooting recommendations
         health_results["troubleshooting"] = generate_troubleshooting_recommendations(health_results["checks"])
@@ -123,7 +365,7 @@ def perform_health_check(server_ip, server_name):
         # Critical connectivity checks
         if connectivity_status == "offline":
             health_results["overall_status"] = "unhealthy"
-        elif ssh_port_status == "closed":
+        elif ssh_port_status != "open":
             health_results["overall_status"] = "unhealthy"
         elif ssh_auth_status in ["auth_failed", "no_key"]:
             health_results["overall_status"] = "degraded"
@@ -147,16 +389,22 @@ def perform_health_check(server_ip, server_name):
         }
         return health_results
 
+# SO_LINGER on with a zero timeout: close() sends RST, so probes leave no TIME_WAIT sockets behind
+ABORT_ON_CLOSE = struct.pack('ii', 1, 0)
+
+def probe_port(host, port, timeout=5):
+    """Connect to host:port and reset the connection at once; return connect_ex()'s result (0 = open)"""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, ABORT_ON_CLOSE)
+        sock.settimeout(timeout)
+        return sock.connect_ex((host, port))
+
 def test_ssh_port(host, port, timeout=5):
     """Test if SSH port is open on a host"""
     try:
-        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        sock.settimeout(timeout)
-        result = sock.connect_ex((host, port))
-        sock.close()
-        return result == 0
+        return probe_port(host, port, timeout) == 0
     except Exception as e:
-        app.logger.error(f"SSH port test failed for {host}:{port}: {e}")
+        app.logger.error("SSH port test failed for %s:%s: %s", host, port, e)
         return False
 
 def test_ssh_authentication(host):
@@ -165,55 +413,94 @@ def test_ssh_authentication(host):
         if not os.path.exists(SSH_KEY_PATH):
             return False
             
-        ssh = paramiko.SSHClient()
-        ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-        
-        private_key = paramiko.Ed25519Key.from_private_key_file(SSH_KEY_PATH)
-        ssh.connect(host, username=SSH_USER, pkey=private_key, timeout=10)
-        ssh.close()
+        # A pooled client exists only once key authentication has succeeded
+        with ssh_pool.connection(host, SSH_USER, timeout=10):
+            pass
         return True
     except Exception as e:
-        app.logger.error(f"SSH authentication test failed for {host}: {e}")
+        app.logger.error("SSH authentication test failed for %s: %s", host, e)
         return False
 
+# One channel, one cat and one df on the remote host - no awk/sed pipelines; sections are split on the --- lines
+SYSTEM_METRICS_COMMAND = "cat /proc/loadavg /proc/uptime; echo ---; cat /proc/meminfo; echo ---; LC_ALL=C df -P /"
+
+def format_uptime(seconds):
+    """Render seconds the way 'uptime -p' does, e.g. 'up 3 days, 2 hours, 1 minute'"""
+    minutes = int(seconds) // 60
+    parts = []
+    for unit, size in (("week", 7 * 24 * 60), ("day", 24 * 60), ("hour", 60), ("minute", 1)):
+        count, minutes = divmod(minutes, size)
+        if count:
+            parts.append(f"{count} {unit}{'s' if count != 1 else ''}")
+    return "up " + (", ".join(parts) or "0 minutes")
+
+def read_system_metrics(ssh):
+    """Return the host's 1-minute load, memory and root disk usage and uptime as strings ('' if unavailable)"""
+    _, output = run_remote(ssh, SYSTEM_METRICS_COMMAND, 10 * 10**9)
+    proc, meminfo, df = (output.split('---\n') + [''] * 3)[:3]
+    metrics = {"cpu_load": "", "memory_usage": "", "disk_usage": "", "uptime": ""}
+    
+    # /proc/loadavg "0.46 0.50 0.55 1/123 4567", then /proc/uptime "12345.67 54321.00"
+    proc_lines = proc.splitlines()
+    if proc_lines and proc_lines[0].split():
+        metrics["cpu_load"] = proc_lines[0].split()[0]
+    if len(proc_lines) > 1 and proc_lines[1].split():
+        try:
+            metrics["uptime"] = format_uptime(float(proc_lines[1].split()[0]))
+        except ValueError:
+            pass
+    # /proc/meminfo "MemTotal:  16314000 kB"; used = total - available, as free(1) reports it
+    mem = {}
+    for line in meminfo.splitlines():
+        key, _, value = line.partition(':')
+        if value.split() and value.split()[0].isdigit():
+            mem[key] = int(value.split()[0])
+    if mem.get("MemTotal") and "MemAvailable" in mem:
+        metrics["memory_usage"] = f"{(mem['MemTotal'] - mem['MemAvailable']) * 100 / mem['MemTotal']:.1f}%"
+    # "Filesystem 1024-blocks Used Available Capacity Mounted on" then one line per filesystem
+    df_lines = df.strip().splitlines()
+    if len(df_lines) > 1 and len(df_lines[-1].split()) > 4:
+        metrics["disk_usage"] = df_lines[-1].split()[4]
+    return metrics
+
+def parse_metric(raw):
+    """Return a metric string from read_system_metrics() ('0.46', '12.5%') as a float, or None if unavailable"""
+    try:
+        return float(raw.rstrip('%'))
+    except ValueError:
+        return None
+
+def gather_metrics(host):
+    """Read a host's metrics over its pooled connection: (display strings, {metric: float or None})"""
+    with ssh_pool.connection(host, SSH_USER, timeout=10) as ssh:
+        metrics = read_system_metrics(ssh)
+    return metrics, {key: parse_metric(metrics[key]) for key in ("cpu_load", "memory_usage", "disk_usage")}
+
+# Detailed check: (metric, label, issue name, value above which it is an issue) - more lenient than the dashboard
+RESOURCE_ISSUE_LIMITS = (
+    ("cpu_load", "CPU Load", "CPU load", 4.0),
+    ("memory_usage", "Memory Usage", "memory usage", 95),
+    ("disk_usage", "Disk Usage", "disk usage", 95),
+)
+
 def check_system_resources(host):
     """Check system resources on a remote host"""
     try:
-        ssh = paramiko.SSHClient()
-        ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-        
-        private_key = paramiko.Ed25519Key.from_private_key_file(SSH_KEY_PATH)
-        ssh.connect(host, username=SSH_USER, pkey=private_key, timeout=10)
-        
-        # Check CPU load
-        stdin, stdout, stderr = ssh.exec_command("uptime | awk '{print $10}' | sed 's/,//'", timeout=10)
-        cpu_load = stdout.read().decode().strip()
-        
-        # Check memory usage
-        stdin, stdout, stderr = ssh.exec_command("free -m | awk 'NR==2{printf \"%.1f%%\", $3*100/$2}'", timeout=10)
-        memory_usage = stdout.read().decode().strip()
-        
-        # Check disk usage
-        stdin, stdout, stderr = ssh.exec_command("df -h / | awk 'NR==2{print $5}'", timeout=10)
-        disk_usage = stdout.read().decode().strip()
-        
-        ssh.close()
+        metrics, values = gather_metrics(host)
+        cpu_load = metrics["cpu_load"]
+        memory_usage = metrics["memory_usage"]
+        disk_usage = metrics["disk_usage"]
         
         # Determine resource health
-        try:
-            load_float = float(cpu_load)
-            mem_float = float(memory_usage.replace('%', ''))
-            disk_float = float(disk_usage.replace('%', ''))
-            
-            if load_float < 2.0 and mem_float < 80 and disk_float < 80:
-                status = "healthy"
-            elif load_float < 5.0 and mem_float < 90 and disk_float < 90:
-                status = "warning"
-            else:
-                status = "critical"
-                
-        except ValueError:
+        load_float, mem_float, disk_float = values["cpu_load"], values["memory_usage"], values["disk_usage"]
+        if None in (load_float, mem_float, disk_float):
             status = "unknown"
+        elif load_float < 2.0 and mem_float < 80 and disk_float < 80:
+            status = "healthy"
+        elif load_float < 5.0 and mem_float < 90 and disk_float < 90:
+            status = "warning"
+        else:
+            status = "critical"
         
         return {
             "status": status,
@@ -224,39 +511,117 @@ def check_system_resources(host):
         }
         
     except Exception as e:
-        app.logger.error(f"System resource check failed for {host}: {e}")
+        app.logger.error("System resource check failed for %s: %s", host, e)
         return {
             "status": "error",
             "details": f"Failed to check system resources: {str(e)}"
         }
 
-def test_connectivity(host, timeout=5):
+# name -> thread count; "fleet" fans out over servers, "probe" runs one server's checks side by side,
+# "jobs" runs long server setups started with start_job().
+# Separate pools so a fleet task waiting on its probes can never starve them of threads.
+EXECUTOR_SIZES = {"fleet": CHECK_WORKERS, "probe": 3 * CHECK_WORKERS, "jobs": 4}
+_executors = {}
+_executors_pid = None
+_executors_lock = threading.Lock()
+
+def shared_executor(name):
+    """This process's long-lived thread pool for name, created on first use (and again in each forked worker)"""
+    global _executors, _executors_pid
+    if _executors_pid != os.getpid() or name not in _executors:
+        with _executors_lock:
+            if _executors_pid != os.getpid():
+                # Pools inherited across fork have no live threads; start over in the child
+                _executors = {}
+                _executors_pid = os.getpid()
+            if name not in _executors:
+                _executors[name] = ThreadPoolExecutor(max_workers=EXECUTOR_SIZES[name],
+                                                      thread_name_prefix=f"lockr-{name}")
+    return _executors[name]
+
+@atexit.register
+def shutdown_executors():
+    """Drop queued checks and let running ones finish when the process exits"""
+    if _executors_pid == os.getpid():
+        for executor in _executors.values():
+            executor.shutdown(wait=False, cancel_futures=True)
+
+def run_parallel(func, items):
+    """Call func on every item concurrently and return the results in input order"""
+    items = list(items)
+    if len(items) <= 1:
+        return [func(item) for item in items]
+    return list(shared_executor("fleet").map(func, items))
+
+@lru_cache(maxsize=None)
+def resolve_command(name, candidates):
+    """Resolve an executable once per process: first existing candidate, then PATH, then the bare name"""
+    for path in candidates:
+        if os.path.exists(path):
+            return path
+    return shutil.which(name) or name
+
+def ping_command():
+    """Path to ping - absolute when found, so subprocess can spawn it without a PATH search"""
+    return resolve_command('ping', ('/usr/bin/ping', '/bin/ping'))
+
+def vault_command():
+    """Path to ansible-vault (ANSIBLE_VAULT_CMD if it is set to anything but the bare name)"""
+    if ANSIBLE_VAULT_CMD != "ansible-vault":
+        return ANSIBLE_VAULT_CMD
+    return resolve_command('ansible-vault', ('/usr/bin/ansible-vault', '/usr/local/bin/ansible-vault'))
+
+# (host, timeout) -> result; absorbs repeated checks from UI polling
+_connectivity_cache = TTLCache(CONNECTIVITY_CACHE_TTL)
+
+def test_connectivity(host, timeout=5, fresh=False):
+    """Test basic connectivity to a host, reusing a result up to CONNECTIVITY_CACHE_TTL seconds old"""
+    key = (host, timeout)
+    if not fresh:
+        cached = _connectivity_cache.get(key)
+        if cached is not None:
+            return dict(cached)
+    
+    result = _test_connectivity(host, timeout)
+    _connectivity_cache.put(key, dict(result))
+    return result
+
+def _test_connectivity(host, timeout):
     """Test basic connectivity to a host"""
+    # A TCP connect to SSH/HTTP/HTTPS needs no fork; ping only runs if no port answers
+    unreachable = {"ping": False, "error": "No accessible ports found"}
     try:
-        # Try multiple possible ping locations
-        ping_locations = ['/usr/bin/ping', '/bin/ping', 'ping']
-        ping_cmd = None
-        
-        for location in ping_locations:
-            if os.path.exists(location) or location == 'ping':
-                ping_cmd = location
-                break
-        
-        if not ping_cmd:
-            return test_connectivity_socket(host, timeout)
+        port = first_open_port(host, (22, 80, 443), timeout)
+        if port is not None:
+            return {"ping": True, "error": None, "method": f"port {port}"}
+    except OSError as e:
+        unreachable = {"ping": False, "error": f"Socket test error: {str(e)}"}
+    
+    try:
+        if icmp_ping(host, min(timeout, 3)):
+            return {"ping": True, "error": None, "method": "icmp"}
+        return {"ping": False, "error": "Ping timeout"}
+    except OSError:
+        # Unprivileged ICMP is not allowed for this user (net.ipv4.ping_group_range) - fork ping instead
+        if not PING_FALLBACK:
+            return unreachable
+    
+    try:
+        # close_fds=False: our descriptors are non-inheritable already, and it lets subprocess use posix_spawn
+        ping_cmd = ping_command()
         
         # Use more lenient ping parameters for better compatibility
         result = subprocess.run([ping_cmd, '-c', '1', '-W', '3', host], 
-                              capture_output=True, text=True, timeout=timeout+2)
+                              capture_output=True, text=True, timeout=timeout+2, close_fds=False)
         
         # Debug output for troubleshooting
-        print(f"Ping result for {host}: returncode={result.returncode}")
-        print(f"STDOUT: {result.stdout}")
-        print(f"STDERR: {result.stderr}")
-        print(f"Command executed: {ping_cmd} -c 1 -W 3 {host}")
+        app.logger.debug("Ping result for %s: returncode=%s", host, result.returncode)
+        app.logger.debug("STDOUT: %s", result.stdout)
+        app.logger.debug("STDERR: %s", result.stderr)
+        app.logger.debug("Command executed: %s -c 1 -W 3 %s", ping_cmd, host)
         
         if result.returncode == 0:
-            return {"ping": True, "error": None}
+            return {"ping": True, "error": None, "method": "ping"}
         else:
             # Check if it's actually unreachable or just slow
             if "100% packet loss" in result.stdout or "100% packet loss" in result.stderr:
@@ -264,120 +629,124 @@ def test_connectivity(host, timeout=5):
             elif "timeout" in result.stdout.lower() or "timeout" in result.stderr.lower():
                 return {"ping": False, "error": "Ping timeout"}
             else:
-                # Try socket test as fallback
-                return test_connectivity_socket(host, timeout)
+                return unreachable
     except subprocess.TimeoutExpired:
         return {"ping": False, "error": "Ping timeout"}
     except FileNotFoundError:
-        # Fallback to socket-based connectivity test
-        return test_connectivity_socket(host, timeout)
+        # No ping binary - the socket probe above was the only test
+        return unreachable
     except Exception as e:
         return {"ping": False, "error": f"Connectivity test error: {str(e)}"}
 
-def test_connectivity_socket(host, timeout=5):
-    """Fallback connectivity test using socket connections"""
+def icmp_ping(host, timeout=3):
+    """Send one ICMP echo over an unprivileged datagram socket; True if a reply arrives within timeout"""
+    address = socket.getaddrinfo(host, None, socket.AF_INET, socket.SOCK_DGRAM)[0][4][0]
+    # Raises PermissionError unless our group is in net.ipv4.ping_group_range; the kernel sets the id
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_ICMP) as sock:
+        sequence = secrets.randbits(16)
+        sock.connect((address, 0))
+        sock.send(bytes((8, 0, 0, 0, 0, 0, sequence >> 8, sequence & 0xff)) + b'lockr')
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            sock.settimeout(remaining)
+            try:
+                reply = sock.recv(1024)
+            except socket.timeout:
+                return False
+            # Echo reply (type 0) carrying our sequence number
+            if len(reply) >= 8 and reply[0] == 0 and reply[6:8] == bytes((sequence >> 8, sequence & 0xff)):
+                return True
+
+def first_open_port(host, ports, timeout=5):
+    """Connect to all ports at once and return the first that accepts, or None after timeout"""
+    address = socket.getaddrinfo(host, None, socket.AF_INET, socket.SOCK_STREAM)[0][4][0]
+    deadline = time.monotonic_ns() + int(timeout * 10**9)
+    selector = selectors.DefaultSelector()
     try:
-        # Try to connect to common ports (SSH, HTTP, HTTPS)
-        ports = [22, 80, 443]
         for port in ports:
-            try:
-                sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                sock.settimeout(timeout)
-                result = sock.connect_ex((host, port))
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, ABORT_ON_CLOSE)
+            sock.setblocking(False)
+            result = sock.connect_ex((address, port))
+            if result == 0:
                 sock.close()
-                if result == 0:
-                    print(f"Socket test successful for {host}:{port}")
-                    return {"ping": True, "error": None, "method": f"port {port}"}
-            except Exception as port_error:
-                print(f"Socket test failed for {host}:{port} - {port_error}")
-                continue
+                return port
+            if result in (errno.EINPROGRESS, errno.EWOULDBLOCK):
+                selector.register(sock, selectors.EVENT_WRITE, port)
+            else:
+                sock.close()
+
+        while selector.get_map():
+            remaining = deadline - time.monotonic_ns()
+            if remaining <= 0:
+                return None
+            for key, _ in selector.select(remaining / 1e9):
+                selector.unregister(key.fileobj)
+                error = key.fileobj.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+                key.fileobj.close()
+                if error == 0:
+                    return key.data
+        return None
+    finally:
+        for key in list(selector.get_map().values()):
+            key.fileobj.close()
+        selector.close()
+
+def test_connectivity_socket(host, timeout=5):
+    """Fallback connectivity test using socket connections"""
+    try:
+        # Try to connect to common ports (SSH, HTTP, HTTPS) in parallel
+        port = first_open_port(host, (22, 80, 443), timeout)
+        if port is not None:
+            app.logger.debug("Socket test successful for %s:%s", host, port)
+            return {"ping": True, "error": None, "method": f"port {port}"}
         
-        print(f"All socket tests failed for {host}")
+        app.logger.debug("All socket tests failed for %s", host)
         return {"ping": False, "error": "No accessible ports found"}
     except Exception as e:
-        print(f"Socket test error for {host}: {e}")
+        app.logger.error("Socket test error for %s: %s", host, e)
         return {"ping": False, "error": f"Socket test error: {str(e)}"}
 
 def test_connectivity_detailed(host, timeout=5):
     """Test basic connectivity with detailed diagnostics"""
     try:
-        # Try ping first
-        ping_locations = ['/usr/bin/ping', '/bin/ping', 'ping']
-        ping_cmd = None
-        
-        for location in ping_locations:
-            if os.path.exists(location) or location == 'ping':
-                ping_cmd = location
-                break
+        # SSH is what Lockr needs, so a TCP connect (22, then 80/443) decides first - no process is forked
+        port = first_open_port(host, (22, 80, 443), timeout)
+        if port is not None:
+            return {
+                "status": "online",
+                "details": f"Connectivity successful via port {port}",
+                "method": f"port {port}",
+                "troubleshooting": []
+            }
         
-        if ping_cmd:
-            try:
-                result = subprocess.run([ping_cmd, '-c', '1', '-W', str(timeout), host], 
-                                      capture_output=True, text=True, timeout=timeout+2)
-                if result.returncode == 0:
-                    return {
-                        "status": "online",
-                        "details": f"Ping successful to {host}",
-                        "method": "ping",
-                        "troubleshooting": []
-                    }
-                else:
-                    # Try socket fallback
-                    socket_result = test_connectivity_socket(host, timeout)
-                    if socket_result["ping"]:
-                        return {
-                            "status": "online",
-                            "details": f"Connectivity successful via {socket_result['method']} (ping failed but port accessible)",
-                            "method": socket_result["method"],
-                            "troubleshooting": ["Ping failed but port connectivity works - server may have ICMP disabled"]
-                        }
-                    else:
-                        return {
-                            "status": "offline",
-                            "details": f"Ping failed (return code: {result.returncode}): {result.stderr.strip() or result.stdout.strip() or 'No response'}",
-                            "method": "ping",
-                            "troubleshooting": [
-                                "Check if the server IP address is correct",
-                                "Verify the server is powered on and connected to the network",
-                                "Check firewall settings - server may be blocking ICMP packets",
-                                "Try connecting from another machine to isolate network issues",
-                                "Check if the server is behind a NAT/firewall that blocks ping"
-                            ]
-                        }
-            except subprocess.TimeoutExpired:
-                return {
-                    "status": "offline",
-                    "details": f"Ping timeout after {timeout} seconds",
-                    "method": "ping",
-                    "troubleshooting": [
-                        "Server may be overloaded or unresponsive",
-                        "Check network latency and connectivity",
-                        "Verify the server is not in sleep/hibernation mode",
-                        "Check if the server IP address is correct"
-                    ]
-                }
-        else:
-            # Fallback to socket test
-            socket_result = test_connectivity_socket(host, timeout)
-            if socket_result["ping"]:
+        # No port answered - an in-process ICMP echo tells "filtered" apart from "down"
+        try:
+            if icmp_ping(host, min(timeout, 3)):
                 return {
                     "status": "online",
-                    "details": f"Connectivity successful via {socket_result['method']}",
-                    "method": socket_result["method"],
-                    "troubleshooting": []
-                }
-            else:
-                return {
-                    "status": "offline",
-                    "details": f"Socket connectivity failed: {socket_result['error']}",
-                    "method": "socket",
-                    "troubleshooting": [
-                        "Check if the server IP address is correct",
-                        "Verify the server is powered on and connected to the network",
-                        "Check if SSH service is running on the server",
-                        "Verify network routing and firewall settings"
-                    ]
+                    "details": f"Ping successful to {host} (no SSH/HTTP/HTTPS port accessible)",
+                    "method": "icmp",
+                    "troubleshooting": ["Host answers ping but ports 22, 80 and 443 are closed or filtered"]
                 }
+        except OSError:
+            # Unprivileged ICMP not permitted (net.ipv4.ping_group_range) - the port probe is the verdict
+            pass
+        
+        return {
+            "status": "offline",
+            "details": f"No response from {host} on ports 22, 80 or 443 within {timeout} seconds",
+            "method": "socket",
+            "troubleshooting": [
+                "Check if the server IP address is correct",
+                "Verify the server is powered on and connected to the network",
+                "Check if SSH service is running on the server",
+                "Verify network routing and firewall settings"
+            ]
+        }
     except Exception as e:
         return {
             "status": "error",
@@ -393,10 +762,7 @@ def test_connectivity_detailed(host, timeout=5):
 def test_ssh_port_detailed(host, port, timeout=5):
     """Test SSH port with detailed diagnostics"""
     try:
-        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        sock.settimeout(timeout)
-        result = sock.connect_ex((host, port))
-        sock.close()
+        result = probe_port(host, port, timeout)
         
         if result == 0:
             return {
@@ -443,13 +809,10 @@ def test_ssh_authentication_detailed(host):
                 ]
             }
             
-        ssh = paramiko.SSHClient()
-        ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-        
         try:
-            private_key = paramiko.Ed25519Key.from_private_key_file(SSH_KEY_PATH)
-            ssh.connect(host, username=SSH_USER, pkey=private_key, timeout=10)
-            ssh.close()
+            # A pooled client exists only once key authentication has succeeded
+            with ssh_pool.connection(host, SSH_USER, timeout=10):
+                pass
             return {
                 "status": "authenticated",
                 "details": f"SSH key authentication successful as {SSH_USER}",
@@ -503,54 +866,22 @@ def test_ssh_authentication_detailed(host):
 def check_system_resources_detailed(host):
     """Check system resources with detailed diagnostics"""
     try:
-        ssh = paramiko.SSHClient()
-        ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-        
-        private_key = paramiko.Ed25519Key.from_private_key_file(SSH_KEY_PATH)
-        ssh.connect(host, username=SSH_USER, pkey=private_key, timeout=10)
-        
         issues = []
         details = []
         
-        # Check CPU load (more lenient threshold)
-        try:
-            stdin, stdout, stderr = ssh.exec_command("uptime | awk '{print $10}' | sed 's/,//'", timeout=10)
-            cpu_load = stdout.read().decode().strip()
-            if cpu_load and float(cpu_load) > 4.0:  # Increased threshold from 2.0 to 4.0
-                issues.append(f"Very high CPU load: {cpu_load}")
-            details.append(f"CPU Load: {cpu_load}")
-        except:
-            details.append("CPU Load: Unable to check")
-        
-        # Check memory usage (more lenient threshold)
-        try:
-            stdin, stdout, stderr = ssh.exec_command("free -m | awk 'NR==2{printf \"%.1f%%\", $3*100/$2}'", timeout=10)
-            memory_usage = stdout.read().decode().strip()
-            if memory_usage and float(memory_usage.replace('%', '')) > 95:  # Increased threshold from 90% to 95%
-                issues.append(f"Very high memory usage: {memory_usage}")
-            details.append(f"Memory Usage: {memory_usage}")
-        except:
-            details.append("Memory Usage: Unable to check")
-        
-        # Check disk usage (more lenient threshold)
-        try:
-            stdin, stdout, stderr = ssh.exec_command("df -h / | awk 'NR==2{print $5}'", timeout=10)
-            disk_usage = stdout.read().decode().strip()
-            if disk_usage and float(disk_usage.replace('%', '')) > 95:  # Increased threshold from 90% to 95%
-                issues.append(f"Very high disk usage: {disk_usage}")
-            details.append(f"Disk Usage: {disk_usage}")
-        except:
-            details.append("Disk Usage: Unable to check")
+        metrics, values = gather_metrics(host)
         
-        # Check system uptime
-        try:
-            stdin, stdout, stderr = ssh.exec_command("uptime -p", timeout=10)
-            uptime = stdout.read().decode().strip()
-            details.append(f"Uptime: {uptime}")
-        except:
-            details.append("Uptime: Unable to check")
+        for key, label, issue, limit in RESOURCE_ISSUE_LIMITS:
+            raw, value = metrics[key], values[key]
+            if value is None:
+                details.append(f"{label}: Unable to check")
+                continue
+            if value > limit:
+                issues.append(f"Very high {issue}: {raw}")
+            details.append(f"{label}: {raw}")
         
-        ssh.close()
+        # Check system uptime
+        details.append(f"Uptime: {metrics['uptime']}" if metrics["uptime"] else "Uptime: Unable to check")
         
         if issues:
             return {
@@ -612,7 +943,7 @@ def generate_troubleshooting_recommendations(checks):
 def try_alternative_server_setup(ip_address, hostname):
     """Try to set up SSH access directly from Lockr using alternative methods"""
     try:
-        print(f"Attempting direct SSH setup for {ip_address}")
+        app.logger.info("Attempting direct SSH setup for %s", ip_address)
         
         # Try to connect using password authentication or other methods
         # This is a fallback for servers that don't have SSH keys yet
@@ -637,7 +968,7 @@ def try_alternative_server_setup(ip_address, hostname):
             }
         
     except Exception as e:
-        print(f"Alternative setup failed for {ip_address}: {e}")
+        app.logger.error("Alternative setup failed for %s: %s", ip_address, e)
         return {
             "success": True,
             "message": f"Server {hostname} ({ip_address}) added successfully",
@@ -646,82 +977,87 @@ def try_alternative_server_setup(ip_address, hostname):
             "error": str(e)
         }
 
-def generate_brian_setup_script(ip_address):
-    """Generate the brian setup script with current SSH public key"""
-    try:
-        # Read the current user's public key
-        public_key_path = SSH_KEY_PATH.replace('id_ed25519', 'id_ed25519.pub')
-        if not os.path.exists(public_key_path):
-            return None
-        
-        with open(public_key_path, 'r') as f:
-            ssh_key_content = f.read().strip()
-        
-        # Extract just the key part (remove the comment)
-        ssh_key = ssh_key_content.split()[1] if len(ssh_key_content.split()) > 1 else ssh_key_content
-        
-        # Generate the setup script
-        script_content = f"""#!/bin/bash
+class SetupScriptTemplate(string.Template):
+    """string.Template using %{name} placeholders, leaving the script's own ${VARS} alone"""
+    delimiter = '%'
+
+# brian account setup script run on new servers (see generate_brian_setup_script)
+BRIAN_SETUP_TEMPLATE = SetupScriptTemplate("""#!/bin/bash
 set -e  # Exit immediately if any command exits with a non-zero status
 
 # Custom parameters for the brian account
 ADMIN_USER="brian"
-SSH_KEY="{ssh_key}"
-PUBKEY="ssh-ed25519 {ssh_key} brian@ser8"
-HOME_DIR="/home/${{ADMIN_USER}}"
-SUDOERS_FILE="/etc/sudoers.d/sudoers_${{ADMIN_USER}}"
+SSH_KEY="%{ssh_key}"
+PUBKEY="ssh-ed25519 %{ssh_key} brian@ser8"
+HOME_DIR="/home/${ADMIN_USER}"
+SUDOERS_FILE="/etc/sudoers.d/sudoers_${ADMIN_USER}"
 
 echo "Setting up brian user account on $(hostname)..."
 
 # Check if the user 'brian' exists; if not, create the user
-if ! grep -q "^${{ADMIN_USER}}:" /etc/passwd; then
-    echo "Creating local user ${{ADMIN_USER}}..."
-    useradd -d "${{HOME_DIR}}" -m -s /bin/bash ${{ADMIN_USER}}
-    passwd -l ${{ADMIN_USER}}
+if ! grep -q "^${ADMIN_USER}:" /etc/passwd; then
+    echo "Creating local user ${ADMIN_USER}..."
+    useradd -d "${HOME_DIR}" -m -s /bin/bash ${ADMIN_USER}
+    passwd -l ${ADMIN_USER}
 fi
 
 # Ensure the .ssh directory exists for the user
-if [ ! -d "${{HOME_DIR}}/.ssh" ]; then
-    echo "Creating ${{HOME_DIR}}/.ssh directory..."
-    mkdir -p "${{HOME_DIR}}/.ssh"
-    chown -R ${{ADMIN_USER}}:${{ADMIN_USER}} "${{HOME_DIR}}"
-    chmod 700 "${{HOME_DIR}}/.ssh"
+if [ ! -d "${HOME_DIR}/.ssh" ]; then
+    echo "Creating ${HOME_DIR}/.ssh directory..."
+    mkdir -p "${HOME_DIR}/.ssh"
+    chown -R ${ADMIN_USER}:${ADMIN_USER} "${HOME_DIR}"
+    chmod 700 "${HOME_DIR}/.ssh"
 fi  
 
 # Path to the authorized_keys file
-AUTHORIZED_KEYS="${{HOME_DIR}}/.ssh/authorized_keys"
+AUTHORIZED_KEYS="${HOME_DIR}/.ssh/authorized_keys"
 
 # Add the public key if it is not already present
-if [ ! -f "${{AUTHORIZED_KEYS}}" ] || ! grep -q "${{SSH_KEY}}" "${{AUTHORIZED_KEYS}}"; then
-    echo "Adding public key to ${{AUTHORIZED_KEYS}}..."
-    cat <<EOF >> "${{AUTHORIZED_KEYS}}"
-${{PUBKEY}}
+if [ ! -f "${AUTHORIZED_KEYS}" ] || ! grep -q "${SSH_KEY}" "${AUTHORIZED_KEYS}"; then
+    echo "Adding public key to ${AUTHORIZED_KEYS}..."
+    cat <<EOF >> "${AUTHORIZED_KEYS}"
+${PUBKEY}
 EOF
-    chown -R ${{ADMIN_USER}}:${{ADMIN_USER}} "${{HOME_DIR}}/.ssh"
-    chmod 600 "${{AUTHORIZED_KEYS}}"
+    chown -R ${ADMIN_USER}:${ADMIN_USER} "${HOME_DIR}/.ssh"
+    chmod 600 "${AUTHORIZED_KEYS}"
 fi
 
 # Grant passwordless sudo privileges to the user
-if [ ! -f "${{SUDOERS_FILE}}" ]; then
-    echo "Setting up sudo for ${{ADMIN_USER}}..."
-    echo "${{ADMIN_USER}} ALL=(ALL) NOPASSWD: ALL" > "${{SUDOERS_FILE}}"
-    chmod 644 "${{SUDOERS_FILE}}"
+if [ ! -f "${SUDOERS_FILE}" ]; then
+    echo "Setting up sudo for ${ADMIN_USER}..."
+    echo "${ADMIN_USER} ALL=(ALL) NOPASSWD: ALL" > "${SUDOERS_FILE}"
+    chmod 644 "${SUDOERS_FILE}"
 fi
 
 echo "Setup complete! User brian now has SSH key access and sudo privileges."
-echo "You can now SSH to this server using: ssh brian@{ip_address}"
-"""
+echo "You can now SSH to this server using: ssh brian@%{ip_address}"
+""")
+
+def generate_brian_setup_script(ip_address):
+    """Generate the brian setup script with current SSH public key"""
+    try:
+        # Read the current user's public key
+        public_key_path = SSH_KEY_PATH.replace('id_ed25519', 'id_ed25519.pub')
+        ssh_key_content = read_public_key(public_key_path)
+        if ssh_key_content is None:
+            return None
+        
+        # Extract just the key part (remove the comment)
+        ssh_key = ssh_key_content.split()[1] if len(ssh_key_content.split()) > 1 else ssh_key_content
+        
+        # Generate the setup script
+        script_content = BRIAN_SETUP_TEMPLATE.substitute(ssh_key=ssh_key, ip_address=ip_address)
         
         return script_content
         
     except Exception as e:
-        print(f"Failed to generate setup script: {e}")
+        app.logger.error("Failed to generate setup script: %s", e)
         return None
 
 def try_direct_ssh_setup(ip_address, hostname):
     """Execute Ansible playbook to set up SSH access via central server"""
     try:
-        print(f"Executing Ansible playbook for SSH setup on {ip_address}")
+        app.logger.info("Executing Ansible playbook for SSH setup on %s", ip_address)
         
         # Path to the setup script
         setup_script = os.path.join(os.getcwd(), "setup_server_ssh.sh")
@@ -738,19 +1074,19 @@ def try_direct_ssh_setup(ip_address, hostname):
                 ]
             }
         
-        # Execute the Ansible playbook
-        cmd = f"{setup_script} {ip_address} {hostname}"
-        print(f"Executing: {cmd}")
+        # Execute the Ansible playbook - argv directly, so no /bin/sh and no word-splitting of the hostname
+        cmd = [setup_script, ip_address, hostname]
+        app.logger.debug("Executing: %s", shlex.join(cmd))
         
-        # Set environment variables for the subprocess
+        # Set environment variables for the subprocess (the script looks up ansible-playbook on PATH)
         env = os.environ.copy()
         env['PATH'] = f"/usr/local/bin:/usr/bin:/bin:{env.get('PATH', '')}"
         
-        result = subprocess.run(cmd, shell=True, capture_output=True, text=True, timeout=300, env=env)
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=300, env=env, close_fds=False)
         
-        print(f"Command output: {result.stdout}")
-        print(f"Command error: {result.stderr}")
-        print(f"Return code: {result.returncode}")
+        app.logger.debug("Command output: %s", result.stdout)
+        app.logger.debug("Command error: %s", result.stderr)
+        app.logger.debug("Return code: %s", result.returncode)
         
         if result.returncode == 0:
             return {
@@ -796,35 +1132,163 @@ def try_direct_ssh_setup(ip_address, hostname):
             ]
         }
 
+@lru_cache(maxsize=8)
+def _load_private_key_file(key_path, mtime_ns):
+    return paramiko.Ed25519Key.from_private_key_file(key_path)
+
+def load_private_key(key_path):
+    """Return the shared key for SSH_KEY_PATH, parsing any other key file once per change"""
+    if key_path == SSH_KEY_PATH:
+        return get_ssh_pkey()
+    return _load_private_key_file(key_path, os.stat(key_path).st_mtime_ns)
+
+@lru_cache(maxsize=8)
+def _read_public_key_file(path, mtime_ns):
+    with open(path, 'r') as f:
+        return f.read().strip()
+
+def read_public_key(path):
+    """Return the stripped contents of a public key file (cached until it changes), or None if missing"""
+    try:
+        return _read_public_key_file(path, os.stat(path).st_mtime_ns)
+    except FileNotFoundError:
+        return None
+
+def configure_transport(ssh, keepalive=SSH_KEEPALIVE_S):
+    """Disable Nagle on an SSH client's socket and enable TCP/SSH keepalives"""
+    transport = ssh.get_transport()
+    sock = transport.sock
+    # Commands and their replies are small packets; Nagle would hold them back ~40ms
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+    # SSH-level keepalives stop NAT/firewall idle timers from silently killing sessions
+    transport.set_keepalive(keepalive)
+
+class SSHConnectionPool:
+    """Process-wide cache of authenticated SSH clients keyed by (host, username, key_path)"""
+
+    # Clients idle longer than this get an SSH_MSG_IGNORE before reuse, so a reset connection fails here
+    # (and is replaced) rather than in the middle of the caller's command
+    probe_after_s = 10
+
+    def __init__(self, max_size, idle_timeout):
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self._clients = {}  # key -> [client, last used (monotonic)]
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _is_alive(client):
+        transport = client.get_transport()
+        return transport is not None and transport.is_active()
+
+    @classmethod
+    def _responds(cls, client):
+        try:
+            client.get_transport().send_ignore()
+        except (paramiko.SSHException, EOFError, OSError, AttributeError):
+            return False
+        return cls._is_alive(client)
+
+    def _evict(self, now):
+        """Drop dead and idle clients, then the least recently used ones over max_size (lock held)"""
+        stale = [key for key, (client, last_used) in self._clients.items()
+                 if now - last_used > self.idle_timeout or not self._is_alive(client)]
+        while len(self._clients) - len(stale) >= self.max_size:
+            lru = min((key for key in self._clients if key not in stale), key=lambda k: self._clients[k][1])
+            stale.append(lru)
+        return [self._clients.pop(key)[0] for key in stale]
+
+    def get(self, host, username, key_path=SSH_KEY_PATH, timeout=None):
+        """Return a live client for host/username, connecting only if none is cached (timeout defaults to SSH_TIMEOUT)"""
+        if timeout is None:
+            timeout = SSH_TIMEOUT
+        key = (host, username, key_path)
+        now = time.monotonic()
+        cached = None
+        with self._lock:
+            entry = self._clients.get(key)
+            if entry is not None and self._is_alive(entry[0]):
+                cached, last_used = entry[0], entry[1]
+                entry[1] = now
+        if cached is not None:
+            if now - last_used <= self.probe_after_s or self._responds(cached):
+                return cached
+            self.discard(host, username, key_path)
+
+        # Connect outside the lock so one slow host does not block the others
+        client = paramiko.SSHClient()
+        client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        try:
+            client.connect(host, username=username, pkey=load_private_key(key_path), timeout=timeout)
+            configure_transport(client)
+        except Exception:
+            client.close()
+            raise
+
+        with self._lock:
+            entry = self._clients.get(key)
+            if entry is not None and self._is_alive(entry[0]):
+                # Another thread connected first - keep its client
+                entry[1] = now
+                closing, client = [client], entry[0]
+            else:
+                closing = self._evict(now)
+                self._clients[key] = [client, now]
+        for stale in closing:
+            stale.close()
+        return client
+
+    def close_all(self):
+        """Close every cached client"""
+        with self._lock:
+            clients = [client for client, _ in self._clients.values()]
+            self._clients.clear()
+        for client in clients:
+            client.close()
+
+    def discard(self, host, username, key_path=SSH_KEY_PATH):
+        """Close and forget the cached client for host/username"""
+        with self._lock:
+            entry = self._clients.pop((host, username, key_path), None)
+        if entry is not None:
+            entry[0].close()
+
+    @contextmanager
+    def connection(self, host, username, key_path=SSH_KEY_PATH, timeout=None):
+        """Borrow a pooled client; it is discarded if the block fails with a connection error"""
+        client = self.get(host, username, key_path, timeout)
+        try:
+            yield client
+        except (paramiko.SSHException, EOFError, OSError):
+            self.discard(host, username, key_path)
+            raise
+
+ssh_pool = SSHConnectionPool(SSH_POOL_MAX, SSH_POOL_IDLE_S)
+
 def test_ssh_connection(host, username, key_path, timeout=10):
     """Test SSH connection to a host"""
     try:
-        print(f"Testing SSH connection to {host} as user {username}")
-        print(f"Using key: {key_path}")
-        
-        # Create SSH client
-        ssh = paramiko.SSHClient()
-        ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        app.logger.debug("Testing SSH connection to %s as user %s", host, username)
+        app.logger.debug("Using key: %s", key_path)
         
         # Load private key
         try:
-            private_key = paramiko.Ed25519Key.from_private_key_file(key_path)
-            print(f"Private key loaded successfully")
+            load_private_key(key_path)
+            app.logger.debug("Private key loaded successfully")
         except Exception as key_error:
-            print(f"Failed to load private key: {key_error}")
+            app.logger.error("Failed to load private key: %s", key_error)
             return {"ssh": False, "error": f"Private key load failed: {str(key_error)}"}
         
-        # Connect with timeout
-        print(f"Attempting SSH connection...")
-        ssh.connect(host, username=username, pkey=private_key, timeout=timeout)
-        print(f"SSH connection established successfully")
-        
-        # Test basic command
-        stdin, stdout, stderr = ssh.exec_command('whoami', timeout=5)
-        user = stdout.read().decode().strip()
-        print(f"Remote user: {user}")
-        
-        ssh.close()
+        # Connect with timeout (reuses a live pooled connection if there is one)
+        app.logger.debug("Attempting SSH connection...")
+        with ssh_pool.connection(host, username, key_path, timeout=timeout) as ssh:
+            app.logger.debug("SSH connection established successfully")
+            
+            # Test basic command
+            _, output = run_remote(ssh, 'whoami', 5 * 10**9)
+            user = output.strip()
+            app.logger.debug("Remote user: %s", user)
         
         if user == username:
             return {"ssh": True, "error": None, "user": user}
@@ -832,93 +1296,149 @@ def test_ssh_connection(host, username, key_path, timeout=10):
             return {"ssh": False, "error": f"User mismatch: expected {username}, got {user}"}
             
     except paramiko.AuthenticationException as auth_error:
-        print(f"SSH authentication failed: {auth_error}")
+        app.logger.error("SSH authentication failed for %s: %s", host, auth_error)
         return {"ssh": False, "error": f"SSH authentication failed: {str(auth_error)}"}
     except paramiko.SSHException as e:
-        print(f"SSH error: {e}")
+        app.logger.error("SSH error for %s: %s", host, e)
         return {"ssh": False, "error": f"SSH error: {str(e)}"}
     except socket.timeout:
-        print(f"SSH connection timeout")
+        app.logger.error("SSH connection timeout for %s", host)
         return {"ssh": False, "error": "SSH connection timeout"}
     except Exception as e:
-        print(f"Unexpected SSH error: {e}")
+        app.logger.error("Unexpected SSH error for %s: %s", host, e)
         return {"ssh": False, "error": f"Connection error: {str(e)}"}
 
+def wait_exit_status(channel, timeout_ns):
+    """Wait for a remote command to finish, closing the channel after timeout_ns"""
+    deadline = time.monotonic_ns() + timeout_ns
+    while not channel.status_event.wait(max(0, deadline - time.monotonic_ns()) / 1e9):
+        if time.monotonic_ns() >= deadline:
+            channel.close()
+            raise socket.timeout(f"Remote command did not finish within {timeout_ns // 10**9}s")
+    return channel.recv_exit_status()
+
+def run_remote(ssh, command, timeout_ns=TIMEOUTS_NS["ssh"], input=None):
+    """Run a command on a single channel and return (exit status, combined stdout/stderr text)"""
+    deadline = time.monotonic_ns() + timeout_ns
+    channel = ssh.get_transport().open_session()
+    try:
+        # One merged stream drained as it arrives, so chatty commands cannot fill the window and stall
+        channel.set_combine_stderr(True)
+        channel.settimeout(timeout_ns / 1e9)  # Also bounds sendall() if the remote never reads its input
+        channel.exec_command(command)
+        if input is not None:
+            channel.sendall(input)
+            channel.shutdown_write()
+        output = bytearray()
+        while True:
+            remaining = deadline - time.monotonic_ns()
+            if remaining <= 0:
+                raise socket.timeout(f"Remote command did not finish within {timeout_ns // 10**9}s")
+            channel.settimeout(remaining / 1e9)
+            data = channel.recv(65536)
+            if not data:
+                break
+            output.extend(data)
+        exit_status = wait_exit_status(channel, max(deadline - time.monotonic_ns(), 0))
+        return exit_status, output.decode(errors='replace')
+    finally:
+        channel.close()
+
+# (server_ip, username) -> exists; the create/change forms re-validate the same user as they are edited
+_user_exists_cache = TTLCache(USER_CACHE_TTL)
+
+def check_users_exist(server_ip, usernames, fresh=False):
+    """Return {username: exists} for many users on server_ip, asking the server about uncached ones in one command"""
+    usernames = list(dict.fromkeys(usernames))
+    results = {}
+    if not fresh:
+        for username in usernames:
+            cached = _user_exists_cache.get((server_ip, username))
+            if cached is not None:
+                results[username] = cached
+    missing = [username for username in usernames if username not in results]
+    if missing:
+        # One "1"/"0" line per user, in order, over the pooled SSH_USER connection
+        command = ('for u in ' + ' '.join(shlex.quote(u) for u in missing) +
+                   '; do if id -- "$u" >/dev/null 2>&1; then echo 1; else echo 0; fi; done')
+        with ssh_pool.connection(server_ip, SSH_USER) as ssh:
+            exit_status, output = run_remote(ssh, command, 10 * 10**9)
+        flags = output.split()
+        if exit_status != 0 or len(flags) != len(missing):
+            raise RuntimeError(f"Unexpected output from user check on {server_ip}: {output.strip()}")
+        for username, flag in zip(missing, flags):
+            results[username] = flag == '1'
+            _user_exists_cache.put((server_ip, username), results[username])
+    return {username: results[username] for username in usernames}
+
+def check_user_exists(server_ip, username, fresh=False):
+    """Return True if username exists on server_ip (checked over the pooled SSH_USER connection)"""
+    return check_users_exist(server_ip, [username], fresh)[username]
+
+def set_passwords(server_ip, credentials):
+    """Set [(username, password), ...] on server_ip with one chpasswd fed over stdin; return (exit status, output)"""
+    lines = []
+    for username, password in credentials:
+        if ':' in username or '\n' in username or '\n' in password:
+            raise ValueError(f"Invalid username or password for {username!r}")
+        lines.append(f"{username}:{password}\n")
+    # Passwords travel on stdin only, so they never appear in a command line, the shell or ps;
+    # -n fails at once if sudo wants a password, instead of stalling until the timeout with no tty to ask on
+    with ssh_pool.connection(server_ip, SSH_USER) as ssh:
+        return run_remote(ssh, 'sudo -n chpasswd', 30 * 10**9, input=''.join(lines).encode())
+
+def verify_password_login(server_ip, username, password):
+    """Return True if username can log in to server_ip with password (a fresh, unpooled connection)"""
+    test_ssh = paramiko.SSHClient()
+    test_ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+    try:
+        app.logger.info("Testing SSH connection with new password for %s@%s", username, server_ip)
+        test_ssh.connect(server_ip, username=username, password=password, timeout=10,
+                         look_for_keys=False, allow_agent=False)
+        app.logger.info("SSH connection with new password successful")
+        return True
+    except Exception as verify_error:
+        app.logger.error("Password verification failed: %s", verify_error)
+        return False
+    finally:
+        test_ssh.close()
+
+# Exit status upload_and_execute_script's remote command uses for "installed, but sudo -n still fails"
+SUDO_CHECK_FAILED = 254
+
 def upload_and_execute_script(host, username, key_path, script_content):
     """Upload and execute the brian-install.sh script on a remote server"""
     try:
-        # Create SSH client
-        ssh = paramiko.SSHClient()
-        ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-        
-        # Load private key
-        private_key = paramiko.Ed25519Key.from_private_key_file(key_path)
-        
-        # Connect
-        ssh.connect(host, username=username, pkey=private_key, timeout=15)
-        
-        # Create SFTP client
-        sftp = ssh.open_sftp()
+        remote_script_path = "/tmp/brian-install.sh"
         
-        # First, upload the public key
-        public_key_path = key_path.replace('id_ed25519', 'id_ed25519.pub')
-        if not os.path.exists(public_key_path):
+        with ssh_pool.connection(host, username, key_path, timeout=15) as ssh:
+            # Upload (script via stdin), run, clean up and verify sudo access in one channel;
+            # the exit status is the script's, or SUDO_CHECK_FAILED if it passed but sudo -n does not
+            script = shlex.quote(remote_script_path)
+            pipeline = (
+                f"cat > {script} && chmod 755 {script} "
+                f"&& sudo {script}; rc=$?; rm -f {script}; "
+                f"if [ $rc -eq 0 ] && ! sudo -n true; then rc={SUDO_CHECK_FAILED}; fi; exit $rc"
+            )
+            # Bounded wait - a hung installer must not pin the request forever
+            exit_status, _ = run_remote(ssh, f"sh -c {shlex.quote(pipeline)}", TIMEOUTS_NS["script"],
+                                        input=script_content.encode())
+        
+        if exit_status == SUDO_CHECK_FAILED:
             return {
                 "success": False,
-                "error": f"Public key not found: {public_key_path}"
+                "error": "Setup verification failed - sudo access not working"
             }
-        
-        # Upload public key to /tmp
-        remote_key_path = "/tmp/brian_public_key"
-        sftp.put(public_key_path, remote_key_path)
-        
-        # Upload script to /tmp
-        remote_script_path = "/tmp/brian-install.sh"
-        with tempfile.NamedTemporaryFile(mode='w', delete=False) as temp_file:
-            temp_file.write(script_content)
-            temp_file.flush()
-            sftp.put(temp_file.name, remote_script_path)
-        
-        # Clean up local temp file
-        os.unlink(temp_file.name)
-        
-        # Make script executable and run it
-        ssh.exec_command(f"chmod +x {remote_script_path}")
-        stdin, stdout, stderr = ssh.exec_command(f"sudo {remote_script_path}", timeout=60)
-        
-        # Wait for completion
-        exit_status = stdout.channel.recv_exit_status()
-        
-        if exit_status == 0:
-            # Verify setup by testing sudo access
-            stdin, stdout, stderr = ssh.exec_command("sudo -n true", timeout=10)
-            sudo_test = stdout.channel.recv_exit_status()
-            
-            if sudo_test == 0:
-                # Clean up remote files
-                ssh.exec_command(f"rm -f {remote_script_path} {remote_key_path}")
-                
-                ssh.close()
-                return {
-                    "success": True,
-                    "message": "Script executed successfully and setup verified",
-                    "exit_status": exit_status
-                }
-            else:
-                ssh.exec_command(f"rm -f {remote_script_path} {remote_key_path}")
-                ssh.close()
-                return {
-                    "success": False,
-                    "error": "Setup verification failed - sudo access not working"
-                }
-        else:
-            # Clean up remote files
-            ssh.exec_command(f"rm -f {remote_script_path} {remote_key_path}")
-            ssh.close()
+        if exit_status != 0:
             return {
                 "success": False,
                 "error": f"Script execution failed with exit status {exit_status}"
             }
+        return {
+            "success": True,
+            "message": "Script executed successfully and setup verified",
+            "exit_status": exit_status
+        }
             
     except Exception as e:
         return {
@@ -926,30 +1446,163 @@ def upload_and_execute_script(host, username, key_path, script_content):
             "error": f"Script execution error: {str(e)}"
         }
 
+# Lowercase, uppercase, digits and symbols - every password gets at least one of each
+PASSWORD_CLASSES = (string.ascii_lowercase, string.ascii_uppercase, string.digits, "!@#$%^&*()_+-=[]{}|;:,.<>?")
+PASSWORD_ALPHABET = "".join(PASSWORD_CLASSES)
+
+def random_indices(bounds):
+    """Yield an unbiased random index below each bound, drawing from the OS RNG in blocks"""
+    pool = b""
+    pos = 0
+    for bound in bounds:
+        bits = (bound - 1).bit_length()
+        width = max(1, (bits + 7) // 8)
+        mask = (1 << bits) - 1
+        while True:
+            if pos + width > len(pool):
+                pool = secrets.token_bytes(64)
+                pos = 0
+            value = int.from_bytes(pool[pos:pos + width], 'big') & mask
+            pos += width
+            if value < bound:  # Rejection sampling keeps every index equally likely
+                yield value
+                break
+
 def generate_secure_password(length=16):
     """Generate a secure random password"""
-    # Define character sets
-    lowercase = string.ascii_lowercase
-    uppercase = string.ascii_uppercase
-    digits = string.digits
-    symbols = "!@#$%^&*()_+-=[]{}|;:,.<>?"
-    
-    # Ensure at least one character from each set
-    password = [
-        secrets.choice(lowercase),
-        secrets.choice(uppercase),
-        secrets.choice(digits),
-        secrets.choice(symbols)
-    ]
-    
-    # Fill the rest randomly
-    all_chars = lowercase + uppercase + digits + symbols
-    password.extend(secrets.choice(all_chars) for _ in range(length - 4))
+    fill = max(length - len(PASSWORD_CLASSES), 0)
+    size = len(PASSWORD_CLASSES) + fill
+    
+    # Draw the class picks, the fill and the Fisher-Yates swaps from one random stream
+    bounds = [len(chars) for chars in PASSWORD_CLASSES]
+    bounds += [len(PASSWORD_ALPHABET)] * fill
+    bounds += range(size, 1, -1)
+    indices = random_indices(bounds)
+    
+    # Ensure at least one character from each set, then fill the rest randomly
+    password = [chars[next(indices)] for chars in PASSWORD_CLASSES]
+    password.extend(PASSWORD_ALPHABET[next(indices)] for _ in range(fill))
     
     # Shuffle the password
-    password_list = list(password)
-    secrets.SystemRandom().shuffle(password_list)
-    return ''.join(password_list)
+    for i in range(size - 1, 0, -1):
+        j = next(indices)
+        password[i], password[j] = password[j], password[i]
+    return ''.join(password)
+
+VAULT_HEADER = b"$ANSIBLE_VAULT;1.1;AES256"
+
+def read_vault_secret():
+    """Read the vault password from VAULT_KEY, kept in memory until the key file changes"""
+    return _load_vault_secret(VAULT_KEY, os.stat(VAULT_KEY).st_mtime_ns)
+
+@lru_cache(maxsize=1)
+def _load_vault_secret(path, mtime_ns):
+    """Read the vault password the same way ansible-vault does"""
+    if os.access(path, os.X_OK):
+        # Executable vault key files are scripts that print the password
+        result = subprocess.run([path], capture_output=True, check=True, timeout=30)
+        return result.stdout.strip()
+    with open(path, 'rb') as f:
+        return f.read().strip()
+
+def derive_vault_keys(secret, salt):
+    """Derive the AES key, HMAC key and counter IV for an Ansible Vault AES256 payload"""
+    kdf = PBKDF2HMAC(algorithm=hashes.SHA256(), length=80, salt=salt, iterations=VAULT_KDF_ITERATIONS)
+    derived = kdf.derive(secret)
+    return derived[:32], derived[32:64], derived[64:]
+
+# Per-file memo: each vault file has its own salt, so the PBKDF2 run for a file is paid once per worker
+# instead of again whenever its plaintext expires from _vault_cache (the secret stays in memory anyway)
+derive_file_vault_keys = lru_cache(maxsize=VAULT_CACHE_SIZE)(derive_vault_keys)
+
+def encrypt_vault_text(plaintext):
+    """Encrypt bytes in-process into the Ansible Vault 1.1 AES256 format"""
+    # A fresh salt per file (a shared one would repeat the CTR keystream); memoized, so this worker
+    # decrypts the new entry without a second PBKDF2 run
+    salt = os.urandom(32)
+    aes_key, hmac_key, iv = derive_file_vault_keys(read_vault_secret(), salt)
+    
+    padder = padding.PKCS7(algorithms.AES.block_size).padder()
+    padded = padder.update(plaintext) + padder.finalize()
+    encryptor = Cipher(algorithms.AES(aes_key), modes.CTR(iv)).encryptor()
+    ciphertext = encryptor.update(padded) + encryptor.finalize()
+    
+    signer = hmac.HMAC(hmac_key, hashes.SHA256())
+    signer.update(ciphertext)
+    
+    body = binascii.hexlify(b"\n".join(binascii.hexlify(part) for part in (salt, signer.finalize(), ciphertext)))
+    lines = [body[i:i + 80] for i in range(0, len(body), 80)]
+    return b"\n".join([VAULT_HEADER] + lines) + b"\n"
+
+def decrypt_vault_text(vaulttext):
+    """Decrypt an Ansible Vault 1.1/1.2 AES256 payload in-process"""
+    lines = vaulttext.strip().splitlines()
+    header = lines[0].strip().split(b";") if lines else []
+    if len(header) < 3 or header[0] != b"$ANSIBLE_VAULT" or header[2].strip() != b"AES256":
+        raise ValueError("Unsupported vault format")
+    
+    body = binascii.unhexlify(b"".join(line.strip() for line in lines[1:]))
+    salt, expected_hmac, ciphertext = (binascii.unhexlify(part) for part in body.split(b"\n", 2))
+    aes_key, hmac_key, iv = derive_file_vault_keys(read_vault_secret(), salt)
+    
+    verifier = hmac.HMAC(hmac_key, hashes.SHA256())
+    verifier.update(ciphertext)
+    try:
+        verifier.verify(expected_hmac)
+    except InvalidSignature:
+        raise ValueError("Vault HMAC verification failed - wrong vault password?")
+    
+    decryptor = Cipher(algorithms.AES(aes_key), modes.CTR(iv)).decryptor()
+    padded = decryptor.update(ciphertext) + decryptor.finalize()
+    unpadder = padding.PKCS7(algorithms.AES.block_size).unpadder()
+    return unpadder.update(padded) + unpadder.finalize()
+
+# Vault file path -> (st_mtime_ns, expiry (monotonic), plaintext), least recently used first
+_vault_cache = OrderedDict()
+_vault_cache_lock = threading.Lock()
+
+def decrypt_vault_file(path):
+    """Decrypt a vault file, reusing the plaintext for VAULT_CACHE_TTL seconds while it is unchanged"""
+    mtime_ns = os.stat(path).st_mtime_ns
+    now = time.monotonic()
+    with _vault_cache_lock:
+        entry = _vault_cache.get(path)
+        if entry is not None and entry[0] == mtime_ns and entry[1] > now:
+            _vault_cache.move_to_end(path)
+            return entry[2]
+    
+    plaintext = _decrypt_vault_file(path)
+    if VAULT_CACHE_SIZE and VAULT_CACHE_TTL:
+        with _vault_cache_lock:
+            _vault_cache[path] = (mtime_ns, now + VAULT_CACHE_TTL, plaintext)
+            _vault_cache.move_to_end(path)
+            while len(_vault_cache) > VAULT_CACHE_SIZE:
+                _vault_cache.popitem(last=False)
+    return plaintext
+
+def clear_vault_cache():
+    """Forget every cached plaintext password and derived file key"""
+    with _vault_cache_lock:
+        _vault_cache.clear()
+    derive_file_vault_keys.cache_clear()
+
+def _decrypt_vault_file(path):
+    """Decrypt a vault file with the configured backend"""
+    if VAULT_BACKEND == "cryptography":
+        with open(path, 'rb') as f:
+            return decrypt_vault_text(f.read()).decode().strip()
+    
+    vault_cmd = vault_command()
+    
+    result = subprocess.run([
+        vault_cmd, "decrypt", path,
+        "--vault-password-file", VAULT_KEY,
+        "--output", "-"
+    ], capture_output=True, text=True, timeout=30)
+    
+    if result.returncode != 0:
+        raise RuntimeError(f"Vault decryption failed: {result.stderr}")
+    return result.stdout.strip()
 
 def create_vault_structure(server, username, password):
     """Create the vault directory structure and store password"""
@@ -958,64 +1611,56 @@ def create_vault_structure(server, username, password):
         timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
         vault_dir = f"{VAULT_DIR}/{server}_{username}_{timestamp}"
         
-        # Create directory
-        os.makedirs(vault_dir, exist_ok=True)
+        # Create directory - VAULT_DIR normally exists, so try the leaf mkdir first
+        try:
+            os.mkdir(vault_dir)
+        except FileNotFoundError:
+            ensure_dirs()
+            os.mkdir(vault_dir)
+        except FileExistsError:
+            pass  # Same server/user/second as an earlier call
+        
+        # Encrypt with Ansible Vault - the plaintext never touches the disk
+        encrypted_file = f"{vault_dir}/password.txt.vault"
         
-        # Create password file
-        password_file = f"{vault_dir}/password.txt"
-        with open(password_file, 'w') as f:
-            f.write(password)
+        if VAULT_BACKEND == "cryptography":
+            # Same on-disk format (and 0600 mode) as ansible-vault, without forking a Python interpreter
+            atomic_write(encrypted_file, encrypt_vault_text(password.encode()), mode=0o600)
+            encrypt_error = None
+        else:
+            vault_cmd = vault_command()
+            app.logger.debug("Using ansible-vault command: %s", vault_cmd)
+            
+            # With no file argument, ansible-vault encrypts stdin
+            result = subprocess.run([
+                vault_cmd, "encrypt",
+                "--vault-password-file", VAULT_KEY,
+                "--output", encrypted_file
+            ], input=password, capture_output=True, text=True, timeout=30)
+            encrypt_error = None if result.returncode == 0 else result.stderr
+        
+        if encrypt_error is not None:
+            return {
+                "success": False,
+                "error": f"Vault encryption failed: {encrypt_error}"
+            }
         
-        # Create current pointer file
+        # Point current at the encrypted file - swapped in whole, so a crash never leaves a truncated pointer
         current_file = f"{VAULT_DIR}/{server}_{username}_current"
-        with open(current_file, 'w') as f:
-            f.write(password_file)
+        atomic_write(current_file, encrypted_file.encode())
         
         # Create initial timestamp file with creation time
         timestamp_file = f"{VAULT_DIR}/{server}_{username}_timestamp"
         creation_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        with open(timestamp_file, 'w') as f:
-            f.write(creation_time)
-        
-        # Encrypt with Ansible Vault
-        encrypted_file = f"{vault_dir}/password.txt.vault"
-        
-        # Try multiple possible ansible-vault locations
-        vault_cmd = ANSIBLE_VAULT_CMD
-        if vault_cmd == "ansible-vault":
-            # Try to find the full path
-            for possible_path in ['/usr/bin/ansible-vault', '/usr/local/bin/ansible-vault', 'ansible-vault']:
-                if os.path.exists(possible_path) or possible_path == 'ansible-vault':
-                    vault_cmd = possible_path
-                    break
-        
-        print(f"Using ansible-vault command: {vault_cmd}")
-        
-        result = subprocess.run([
-            vault_cmd, "encrypt", password_file,
-            "--vault-password-file", VAULT_KEY,
-            "--output", encrypted_file
-        ], capture_output=True, text=True, timeout=30)
+        atomic_write(timestamp_file, creation_time.encode(), durable=False)
+        invalidate_password_listing()
         
-        if result.returncode == 0:
-            # Remove plaintext password file
-            os.remove(password_file)
-            
-            # Update current pointer to encrypted file
-            with open(current_file, 'w') as f:
-                f.write(encrypted_file)
-            
-            return {
-                "success": True,
-                "vault_dir": vault_dir,
-                "encrypted_file": encrypted_file,
-                "timestamp": timestamp
-            }
-        else:
-            return {
-                "success": False,
-                "error": f"Vault encryption failed: {result.stderr}"
-            }
+        return {
+            "success": True,
+            "vault_dir": vault_dir,
+            "encrypted_file": encrypted_file,
+            "timestamp": timestamp
+        }
             
     except Exception as e:
         return {
@@ -1036,8 +1681,7 @@ def retrieve_password_from_vault(server, username):
             }
         
         # Read the current encrypted file path
-        with open(current_file, 'r') as f:
-            encrypted_file = f.read().strip()
+        encrypted_file = read_small_file(current_file)
         
         if not os.path.exists(encrypted_file):
             return {
@@ -1046,36 +1690,24 @@ def retrieve_password_from_vault(server, username):
             }
         
         # Decrypt with Ansible Vault
-        vault_cmd = ANSIBLE_VAULT_CMD
-        if vault_cmd == "ansible-vault":
-            # Try to find the full path
-            for possible_path in ['/usr/bin/ansible-vault', '/usr/local/bin/ansible-vault', 'ansible-vault']:
-                if os.path.exists(possible_path) or possible_path == 'ansible-vault':
-                    vault_cmd = possible_path
-                    break
-        
-        result = subprocess.run([
-            vault_cmd, "decrypt", encrypted_file,
-            "--vault-password-file", VAULT_KEY,
-            "--output", "-"
-        ], capture_output=True, text=True, timeout=30)
-        
-        if result.returncode == 0:
-            # Update the timestamp for this password (last access)
-            update_password_timestamp(server, username)
-            
-            return {
-                "success": True,
-                "password": result.stdout.strip(),
-                "server": server,
-                "username": username,
-                "timestamp": datetime.now().isoformat()
-            }
-        else:
+        try:
+            password = decrypt_vault_file(encrypted_file)
+        except RuntimeError as e:
             return {
                 "success": False,
-                "error": f"Vault decryption failed: {result.stderr}"
+                "error": str(e)
             }
+        
+        # Update the timestamp for this password (last access)
+        update_password_timestamp(server, username)
+        
+        return {
+            "success": True,
+            "password": password,
+            "server": server,
+            "username": username,
+            "timestamp": datetime.now().isoformat()
+        }
             
     except Exception as e:
         return {
@@ -1083,19 +1715,59 @@ def retrieve_password_from_vault(server, username):
             "error": f"Error retrieving password: {str(e)}"
         }
 
+def read_small_file(path, max_bytes=4096):
+    """Read a small vault metadata file with a single unbuffered read"""
+    fd = os.open(path, os.O_RDONLY | os.O_CLOEXEC)
+    try:
+        return os.read(fd, max_bytes).decode().strip()
+    finally:
+        os.close(fd)
+
 def update_password_timestamp(server, username):
     """Update the timestamp for a password"""
     try:
+        ensure_dirs()
         timestamp_file = os.path.join(VAULT_DIR, f"{server}_{username}_timestamp")
         current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        with open(timestamp_file, 'w') as f:
-            f.write(current_time)
+        # Replaced, not rewritten in place, so VAULT_DIR's mtime (the /api/list_passwords ETag) moves
+        atomic_write(timestamp_file, current_time.encode(), durable=False)
+        invalidate_password_listing()
         return True
     except Exception as e:
-        app.logger.error(f"Error updating timestamp for {username}@{server}: {e}")
+        app.logger.error("Error updating timestamp for %s@%s: %s", username, server, e)
         return False
 
+# (password_listing_version(), result) of the last successful listing
+_password_listing = None
+
+def password_listing_version():
+    """Versions of what the listing is built from: VAULT_DIR, and the server list its names are split against"""
+    # Every create, retrieve and timestamp update replaces an entry in VAULT_DIR, moving its mtime
+    vault_version = path_version(VAULT_DIR)
+    if vault_version is None:
+        return None
+    return vault_version + (servers_version() or ())
+
 def list_all_passwords():
+    """List all available passwords in the vault, reusing the last listing while its inputs are unchanged"""
+    global _password_listing
+    version = password_listing_version()
+    cached = _password_listing
+    if version is not None and cached is not None and cached[0] == version:
+        return cached[1]
+    
+    result = _list_all_passwords()
+    if result["success"]:
+        # Timestamp backfill writes land later and move VAULT_DIR's mtime, so they cost one rescan
+        _password_listing = (password_listing_version(), result)
+    return result
+
+def invalidate_password_listing():
+    """Drop this worker's cached listing (mtime alone can miss changes within one clock tick)"""
+    global _password_listing
+    _password_listing = None
+
+def _list_all_passwords():
     """List all available passwords in the vault"""
     try:
         passwords = []
@@ -1103,59 +1775,102 @@ def list_all_passwords():
         if not os.path.exists(VAULT_DIR):
             return {"success": False, "error": "Vault directory not found"}
         
-        # Find all current pointer files
-        for file in os.listdir(VAULT_DIR):
-            if file.endswith('_current'):
-                parts = file.replace('_current', '').split('_', 1)
-                if len(parts) == 2:
-                    server, username = parts
-                    
-                    # Get the actual password file path
-                    current_file = os.path.join(VAULT_DIR, file)
-                    with open(current_file, 'r') as f:
-                        password_file = f.read().strip()
-                    
-                    # Check if timestamp file exists for this password
-                    timestamp_file = os.path.join(VAULT_DIR, f"{server}_{username}_timestamp")
-                    if os.path.exists(timestamp_file):
-                        with open(timestamp_file, 'r') as f:
-                            timestamp_str = f.read().strip()
-                            last_updated = timestamp_str
-                    else:
-                        # Fallback to file modification time if no timestamp file
-                        if os.path.exists(password_file):
-                            mtime = os.path.getmtime(password_file)
-                            last_updated = datetime.fromtimestamp(mtime).strftime("%Y-%m-%d %H:%M:%S")
-                        else:
-                            last_updated = "Unknown"
-                        
-                        # Create timestamp file for backward compatibility
-                        try:
-                            creation_time = datetime.fromtimestamp(mtime).strftime("%Y-%m-%d %H:%M:%S")
-                            with open(timestamp_file, 'w') as f:
-                                f.write(creation_time)
-                        except Exception as e:
-                            app.logger.error(f"Failed to create timestamp file for {username}@{server}: {e}")
+        # Find all current pointer files and existing timestamp files in one directory pass
+        backfill = []
+        pointers = []
+        timestamp_names = set()
+        with os.scandir(VAULT_DIR) as entries:
+            for entry in entries:
+                if entry.name.endswith('_current'):
+                    pointers.append(entry)
+                elif entry.name.endswith('_timestamp'):
+                    timestamp_names.add(entry.name)
+        
+        known_servers = vault_server_names()
+        for entry in pointers:
+            parts = split_vault_name(entry.name[:-len('_current')], known_servers)
+            if parts:
+                server, username = parts
+                
+                # Check if timestamp file exists for this password
+                timestamp_name = f"{server}_{username}_timestamp"
+                if timestamp_name in timestamp_names:
+                    last_updated = read_small_file(os.path.join(VAULT_DIR, timestamp_name))
+                else:
+                    # Fallback to the pointer's modification time - it is rewritten with each password
+                    mtime = entry.stat().st_mtime
+                    last_updated = datetime.fromtimestamp(mtime).strftime("%Y-%m-%d %H:%M:%S")
                     
-                    passwords.append({
-                        "server": server,
-                        "username": username,
-                        "last_updated": last_updated,
-                        "status": "active"
-                    })
+                    # Create timestamp file for backward compatibility (after the response, see below)
+                    backfill.append((server, username, last_updated))
+                
+                passwords.append({
+                    "server": server,
+                    "username": username,
+                    "last_updated": last_updated,
+                    "status": "active"
+                })
+        
+        if backfill:
+            # Synced file writes have no place on the request path; the listing above is already complete
+            shared_executor("fleet").submit(backfill_timestamps, backfill)
         
         return {"success": True, "passwords": passwords}
         
     except Exception as e:
         return {"success": False, "error": f"Error listing passwords: {str(e)}"}
 
+def vault_server_names():
+    """Names a vault entry's server part may take: every configured server's IP and name"""
+    names = set()
+    for server in load_servers(copy=False):
+        names.update(n for n in (server.get('ip'), server.get('name')) if n)
+    return names
+
+def split_vault_name(stem, known_servers):
+    """Split a '<server>_<username>' vault name into (server, username), or None"""
+    # Both halves may contain underscores, so prefer the longest configured server the name starts with
+    matches = [name for name in known_servers if stem.startswith(name + '_') and len(stem) > len(name) + 1]
+    if matches:
+        server = max(matches, key=len)
+        return server, stem[len(server) + 1:]
+    # Unknown server (removed, or never added): IPs and hostnames carry no '_', usernames may
+    parts = stem.split('_', 1)
+    return tuple(parts) if len(parts) == 2 and all(parts) else None
+
+def backfill_timestamps(entries):
+    """Write timestamp files for (server, username, last_updated) entries that predate them"""
+    for server, username, last_updated in entries:
+        timestamp_file = os.path.join(VAULT_DIR, f"{server}_{username}_timestamp")
+        try:
+            # Skip entries a password update has timestamped since the listing - its time is newer
+            if not os.path.exists(timestamp_file):
+                atomic_write(timestamp_file, last_updated.encode(), durable=False)
+        except Exception as e:
+            app.logger.error("Failed to create timestamp file for %s@%s: %s", username, server, e)
+    invalidate_password_listing()
+
 @app.route('/')
 def index():
     """Main dashboard page"""
     if 'authenticated' not in session:
         return redirect(url_for('login'))
     
-    servers = load_servers()
+    known_statuses = ('online', 'offline', 'degraded')
+    # Read-only shared snapshot unless some status must be probed and written back
+    servers = load_servers(copy=False)
+    unknown = [server for server in servers if server['status'] not in known_statuses]
+    if unknown:
+        # If status is unknown, check connectivity - all unknown servers at once (TCP 22/80/443 first)
+        results = run_parallel(lambda server: test_connectivity(server['ip'], timeout=3), unknown)
+        status_by_ip = {server['ip']: 'online' if result.get('ping') else 'offline'
+                        for server, result in zip(unknown, results)}
+        # Save updated statuses
+        with updating_servers() as servers:
+            for server in servers:
+                if server['status'] not in known_statuses and server['ip'] in status_by_ip:
+                    server['status'] = status_by_ip[server['ip']]
+            save_servers(servers)
     
     # Count servers by actual status
     total_servers = len(servers)
@@ -1170,17 +1885,6 @@ def index():
             offline_servers += 1
         elif server['status'] == 'degraded':
             degraded_servers += 1
-        else:
-            # If status is unknown, check connectivity
-            if test_connectivity(server['ip'], timeout=3):
-                server['status'] = 'online'
-                online_servers += 1
-            else:
-                server['status'] = 'offline'
-                offline_servers += 1
-    
-    # Save updated statuses
-    save_servers(servers)
     
     return render_template('enhanced_dashboard.html', 
                          servers=servers,
@@ -1189,6 +1893,19 @@ def index():
                          offline_servers=offline_servers,
                          degraded_servers=degraded_servers)
 
+@lru_cache(maxsize=1)
+def _read_admin_password_hash(path, version):
+    with open(path, 'r') as f:
+        return f.read().strip()
+
+def admin_password_hash():
+    """Current admin password hash: ADMIN_PASSWORD_FILE once it exists, otherwise DEFAULT_PASSWORD_HASH"""
+    try:
+        # Keyed by file version, so a change made in one worker is picked up by the others
+        return _read_admin_password_hash(ADMIN_PASSWORD_FILE, file_version(ADMIN_PASSWORD_FILE))
+    except FileNotFoundError:
+        return config.DEFAULT_PASSWORD_HASH
+
 @app.route('/login', methods=['GET', 'POST'])
 def login():
     """Simple authentication page"""
@@ -1197,7 +1914,10 @@ def login():
         password = request.form.get('password')
         
         # Simple authentication - replace with proper auth in production
-        if username == 'admin' and password == 'admin123':
+        # Both checks always run, so the response time does not reveal whether the username was right
+        password_ok = check_password_hash(admin_password_hash(), password or '')
+        username_ok = secrets.compare_digest((username or '').encode(), DEFAULT_USERNAME.encode())
+        if username_ok and password_ok:
             session.permanent = True  # Make session persistent
             session['authenticated'] = True
             session['username'] = username
@@ -1211,20 +1931,128 @@ def login():
 def logout():
     """Logout user"""
     session.clear()
+    clear_vault_cache()
     return redirect(url_for('login'))
 
+class PayloadError(ValueError):
+    """Invalid request body - answered with 400 and {"error": message}"""
+
+@app.errorhandler(PayloadError)
+def handle_payload_error(e):
+    return jsonify({"error": str(e)}), 400
+
+def json_payload(*required, message=None, types=None):
+    """Return the JSON object body, raising PayloadError unless each `required` field is a non-empty string"""
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        raise PayloadError("JSON object body required")
+    for name in required:
+        value = data.get(name)
+        if not isinstance(value, str) or not value:
+            raise PayloadError(message or f"{name} required")
+    # Optional fields converted in place, e.g. {"password_length": int}
+    for name, kind in (types or {}).items():
+        if data.get(name) is not None:
+            try:
+                data[name] = kind(data[name])
+            except (TypeError, ValueError):
+                raise PayloadError(f"{name} must be {kind.__name__}")
+    return data
+
+# Finished job records older than this are removed when the next job starts
+JOB_RETENTION_S = 24 * 3600
+
+def job_path(job_id):
+    """Status file for a job id, or None if the id is malformed"""
+    if len(job_id) != 32 or not all(c in string.hexdigits for c in job_id):
+        return None
+    return os.path.join(JOBS_DIR, f"{job_id}.json")
+
+def prune_jobs(now):
+    """Delete job status files not modified in the last JOB_RETENTION_S seconds"""
+    try:
+        with os.scandir(JOBS_DIR) as entries:
+            for entry in entries:
+                if entry.name.endswith('.json') and now - entry.stat().st_mtime > JOB_RETENTION_S:
+                    try:
+                        os.unlink(entry.path)
+                    except FileNotFoundError:
+                        pass
+    except FileNotFoundError:
+        pass
+
+def process_alive(pid):
+    """True if a process with this pid exists (it may belong to another user)"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+def start_job(view):
+    """Run a view on the jobs pool with this request's context and answer 202 with its job id"""
+    # Status lives on disk, not in this worker, so a poll answered by any gunicorn worker finds it
+    job_id = secrets.token_hex(16)
+    # The pid lets a poll tell a job still running from one whose worker was killed or restarted
+    record = {"job_id": job_id, "status": "running", "started": now_iso(), "pid": os.getpid()}
+    os.makedirs(JOBS_DIR, exist_ok=True)
+    prune_jobs(time.time())
+    atomic_write(job_path(job_id), json_dumps(record), durable=False)
+    # Parse the body now; the WSGI input stream is gone once this request has been answered
+    request.get_json(silent=True)
+    
+    @copy_current_request_context
+    def run():
+        try:
+            response = app.make_response(view())
+            record.update(status="done", status_code=response.status_code, result=response.get_json())
+        except Exception as e:
+            app.logger.error("Background job %s failed: %s", job_id, e)
+            record.update(status="done", status_code=500, result={"success": False, "error": str(e)})
+        record["finished"] = now_iso()
+        atomic_write(job_path(job_id), json_dumps(record), durable=False)
+    
+    shared_executor("jobs").submit(run)
+    return jsonify({
+        "success": True,
+        "job_id": job_id,
+        "status_url": url_for('job_status', job_id=job_id)
+    }), 202
+
+@app.route('/api/jobs/<job_id>')
+def job_status(job_id):
+    """API endpoint to poll a background job ({"status": "running"} until "done" with a result, or "failed")"""
+    if 'authenticated' not in session:
+        return jsonify({"error": "Unauthorized"}), 401
+    
+    path = job_path(job_id)
+    if path is None:
+        return jsonify({"error": "Job not found"}), 404
+    try:
+        with open(path, 'rb') as f:
+            record = json_loads(f.read())
+    except FileNotFoundError:
+        return jsonify({"error": "Job not found"}), 404
+    if record["status"] == "running" and not (record.get("pid") and process_alive(record["pid"])):
+        record.update(status="failed", error="The worker running this job exited before it finished")
+    return jsonify(record)
+
 @app.route('/api/add_server', methods=['POST'])
 def add_server():
-    """API endpoint to add a new server"""
+    """API endpoint to add a new server ({"background": true} runs setup as a job, see /api/jobs)"""
     if 'authenticated' not in session:
         return jsonify({"error": "Unauthorized"}), 401
     
-    data = request.get_json()
-    hostname = data.get('hostname')
-    ip_address = data.get('ip_address')
-    
-    if not hostname or not ip_address:
-        return jsonify({"error": "Hostname and IP address required"}), 400
+    data = json_payload('hostname', 'ip_address', message="Hostname and IP address required")
+    if data.get('background') is True:
+        return start_job(lambda: _add_server(data))
+    return _add_server(data)
+
+def _add_server(data):
+    hostname = data['hostname']
+    ip_address = data['ip_address']
     
     try:
         # Test basic connectivity first
@@ -1247,62 +2075,18 @@ def add_server():
         ssh_available = ssh_result['ssh']
         
         if not ssh_available:
-            print(f"SSH not available for {ip_address}: {ssh_result['error']}")
-            print(f"This is normal for new servers. Proceeding with setup...")
+            app.logger.info("SSH not available for %s: %s - normal for new servers, proceeding with setup",
+                            ip_address, ssh_result['error'])
         
         # For new servers, we'll need to use alternative methods to deploy SSH keys
         # This could be via password authentication, cloud-init, or manual setup
         
-        # Get the brian-install.sh script content
-        script_content = """#!/bin/bash
-set -e  # Exit immediately if any command exits with a non-zero status
-
-# Custom parameters for the brian account
-ADMIN_USER="brian"
-SSH_KEY="$(cat /tmp/brian_public_key)"
-PUBKEY="ssh-ed25519 ${SSH_KEY} ${ADMIN_USER}@ser8"
-HOME_DIR="/home/${ADMIN_USER}"
-SUDOERS_FILE="/etc/sudoers.d/sudoers_${ADMIN_USER}"
-
-# Check if the user 'brian' exists; if not, create the user
-if ! grep -q "^${ADMIN_USER}:" /etc/passwd; then
-    echo "Creating local user ${ADMIN_USER}..."
-    useradd -d "${HOME_DIR}" -m -s /bin/bash ${ADMIN_USER}
-    passwd -l ${ADMIN_USER}
-fi
-
-# Ensure the .ssh directory exists for the user
-if [ ! -d "${HOME_DIR}/.ssh" ]; then
-    echo "Creating ${HOME_DIR}/.ssh directory..."
-    mkdir -p "${HOME_DIR}/.ssh"
-    chown -R ${ADMIN_USER}:${ADMIN_USER} "${HOME_DIR}"
-    chmod 700 "${HOME_DIR}/.ssh"
-fi  
-
-# Path to the authorized_keys file
-AUTHORIZED_KEYS="${HOME_DIR}/.ssh/authorized_keys"
-
-# Add the public key if it is not already present
-if [ ! -f "${AUTHORIZED_KEYS}" ] || ! grep -q "${SSH_KEY}" "${AUTHORIZED_KEYS}"; then
-    echo "Adding public key to ${AUTHORIZED_KEYS}..."
-    cat <<EOF >> "${AUTHORIZED_KEYS}"
-${PUBKEY}
-EOF
-    chown -R ${ADMIN_USER}:${ADMIN_USER} "${HOME_DIR}/.ssh"
-    chmod 600 "${AUTHORIZED_KEYS}"
-fi
-
-# Grant passwordless sudo privileges to the user
-if [ ! -f "${SUDOERS_FILE}" ]; then
-    echo "Setting up sudo for ${ADMIN_USER}..."
-    echo "${ADMIN_USER} ALL=(ALL) NOPASSWD: ALL" > "${SUDOERS_FILE}"
-    chmod 644 "${SUDOERS_FILE}"
-fi
-"""
-        
         # Handle server setup based on SSH availability
         if ssh_available:
-            # Server already has SSH access, execute setup script
+            # Server already has SSH access, execute the brian-install.sh script (public key inlined)
+            script_content = generate_brian_setup_script(ip_address)
+            if script_content is None:
+                return jsonify({"success": False, "error": "Failed to generate setup script"}), 500
             script_result = upload_and_execute_script(ip_address, SSH_USER, SSH_KEY_PATH, script_content)
         else:
             # Server doesn't have SSH access yet - try alternative setup methods
@@ -1310,19 +2094,19 @@ fi
         
         if script_result['success']:
             # Add server to the list
-            servers = load_servers()
             new_server = {
                 "name": hostname,
                 "ip": ip_address,
                 "status": "online",
                 "last_access": datetime.now().strftime("%Y-%m-%d %H:%M"),
                 "ssh_status": "connected" if ssh_available else "setup_required",
-                "setup_date": datetime.now().isoformat(),
+                "setup_date": now_iso(),
                 "setup_required": not ssh_available
             }
             
-            servers.append(new_server)
-            save_servers(servers)
+            with updating_servers() as servers:
+                servers.append(new_server)
+                save_servers(servers)
             
             # Log the successful addition
             log_action(session['username'], 'add_server', hostname, ip_address, 'success')
@@ -1365,25 +2149,17 @@ def test_server():
     if 'authenticated' not in session:
         return jsonify({"error": "Unauthorized"}), 401
     
-    data = request.get_json()
-    ip_address = data.get('ip_address')
-    
-    if not ip_address:
-        return jsonify({"error": "IP address required"}), 400
+    data = json_payload('ip_address', message="IP address required")
+    ip_address = data['ip_address']
     
     try:
-        # Test ping connectivity
-        ping_result = test_connectivity(ip_address)
-        
-        # Test SSH connection if ping succeeds
-        ssh_result = None
-        if ping_result['ping']:
-            ssh_result = test_ssh_connection(ip_address, SSH_USER, SSH_KEY_PATH)
+        # Test ping connectivity, then SSH if ping succeeds (?fresh=1 skips the cached ping result)
+        result = probe_server(ip_address, fresh=request.args.get('fresh') == '1')
         
         return jsonify({
             "success": True,
-            "ping": ping_result,
-            "ssh": ssh_result,
+            "ping": result["ping"],
+            "ssh": result["ssh"],
             "ip_address": ip_address
         })
         
@@ -1393,14 +2169,101 @@ def test_server():
             "error": f"Error testing server: {str(e)}"
         }), 500
 
+def probe_server(ip_address, fresh=False):
+    """Ping a host and, if it answers, test SSH - the checks behind /api/test_server and /api/status"""
+    ping_result = test_connectivity(ip_address, fresh=fresh)
+    ssh_result = None
+    if ping_result['ping']:
+        # Reached on 22 already means sshd is listening; otherwise one TCP connect rules it out
+        # before paying for a key exchange that could only time out
+        ssh_listening = ping_result.get('method') == 'port 22'
+        if not ssh_listening:
+            try:
+                ssh_listening = probe_port(ip_address, 22, 2) == 0
+            except OSError:
+                pass
+        if ssh_listening:
+            ssh_result = test_ssh_connection(ip_address, SSH_USER, SSH_KEY_PATH)
+        else:
+            ssh_result = {"ssh": False, "error": "SSH port 22 is not reachable"}
+    return {"ping": ping_result, "ssh": ssh_result}
+
+@app.route('/api/status', methods=['POST'])
+def batch_status():
+    """API endpoint to test many servers in one request (all managed servers if no hosts are given)"""
+    if 'authenticated' not in session:
+        return jsonify({"error": "Unauthorized"}), 401
+    
+    # No body at all means every managed server; any body must be a JSON object
+    data = json_payload() if request.get_data() else {}
+    servers = load_servers(copy=False)
+    hosts = data.get('hosts')
+    if hosts is None:
+        hosts = [server['name'] for server in servers]
+    if not isinstance(hosts, list) or not all(isinstance(host, str) and host for host in hosts):
+        return jsonify({"error": "hosts must be a list of server names or IP addresses"}), 400
+    
+    # Accept server names as well as addresses; unknown names are probed as given
+    hosts = list(dict.fromkeys(hosts))
+    addresses = []
+    for host in hosts:
+        server = find_server(servers, host)
+        addresses.append(server['ip'] if server else host)
+    
+    try:
+        fresh = request.args.get('fresh') == '1'
+        results = run_parallel(lambda address: probe_server(address, fresh), addresses)
+        return jsonify({
+            "success": True,
+            "results": dict(zip(hosts, results))
+        })
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": f"Error testing servers: {str(e)}"
+        }), 500
+
+def version_etag(version):
+    """Weak ETag text for a file_version() tuple, or None without one"""
+    return '-'.join(format(part, 'x') for part in version) if version else None
+
+def conditional_json(etag, build):
+    """304 if the client's If-None-Match has etag, else jsonify(build()); both revalidate on every use"""
+    if etag and request.if_none_match.contains_weak(etag):
+        response = app.response_class(status=304)
+    else:
+        response = jsonify(build())
+    if etag:
+        response.set_etag(etag, weak=True)
+    # Clients may keep the body but must ask again each time - a 304 costs a stat, not a rebuild
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+def path_version(path):
+    """(inode, mtime, size) of a file or directory, or None if it does not exist"""
+    try:
+        return file_version(path)
+    except FileNotFoundError:
+        return None
+
 @app.route('/api/servers')
 def get_servers():
     """API endpoint to get server list"""
     if 'authenticated' not in session:
         return jsonify({"error": "Unauthorized"}), 401
     
-    servers = load_servers()
-    return jsonify({"servers": servers, "status": "success"})
+    servers = load_servers(copy=False)
+    # Tag with the version of the snapshot actually served (the file may be newer until the next refresh)
+    snapshot = _servers_snapshot
+    etag = version_etag(snapshot[0]) if snapshot is not None and snapshot[1] is servers else None
+    return conditional_json(etag, lambda: {"servers": servers, "status": "success"})
+
+def servers_version():
+    """file_version() of the server list load_servers() serves now, or None while it serves MOCK_SERVERS"""
+    servers = load_servers(copy=False)
+    snapshot = _servers_snapshot
+    return snapshot[0] if snapshot is not None and snapshot[1] is servers else None
 
 @app.route('/api/remove_server', methods=['POST'])
 def remove_server():
@@ -1408,23 +2271,19 @@ def remove_server():
     if 'authenticated' not in session:
         return jsonify({"error": "Unauthorized"}), 401
     
-    data = request.get_json()
-    server_name = data.get('server_name')
+    data = json_payload('server_name', message="Server name required")
+    server_name = data['server_name']
     
-    if not server_name:
-        return jsonify({"error": "Server name required"}), 400
-    
-    servers = load_servers()
-    
-    # Find and remove the server
-    original_count = len(servers)
-    servers = [s for s in servers if s['name'] != server_name]
-    
-    if len(servers) == original_count:
-        return jsonify({"error": f"Server '{server_name}' not found"}), 404
-    
-    # Save updated server list
-    if save_servers(servers):
+    with updating_servers() as servers:
+        # Unknown names are answered from the name index without scanning or rewriting the file
+        if find_server(servers, server_name) is None:
+            return jsonify({"error": f"Server '{server_name}' not found"}), 404
+        
+        servers = [s for s in servers if s.get('name') != server_name]
+        
+        # Save updated server list
+        saved = save_servers(servers)
+    if saved:
         return jsonify({
             "status": "success",
             "message": f"Server '{server_name}' removed successfully",
@@ -1439,32 +2298,17 @@ def validate_user():
     if 'authenticated' not in session:
         return jsonify({"error": "Unauthorized"}), 401
     
-    data = request.get_json()
-    server_ip = data.get('server_ip')
-    username = data.get('username')
-    
-    if not server_ip or not username:
-        return jsonify({"error": "Server IP and username required"}), 400
+    data = json_payload('server_ip', 'username', message="Server IP and username required")
+    server_ip = data['server_ip']
+    username = data['username']
     
     try:
-        # Test SSH connection and check if user exists
-        ssh = paramiko.SSHClient()
-        ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-        
         # Load private key
         if not os.path.exists(SSH_KEY_PATH):
             return jsonify({"error": f"SSH key not found at {SSH_KEY_PATH}"}), 500
         
-        private_key = paramiko.Ed25519Key.from_private_key_file(SSH_KEY_PATH)
-        
-        # Connect to server
-        ssh.connect(server_ip, username=SSH_USER, pkey=private_key, timeout=15)
-        
         # Check if user exists
-        stdin, stdout, stderr = ssh.exec_command(f'id {username}', timeout=10)
-        user_exists = stdout.channel.recv_exit_status() == 0
-        
-        ssh.close()
+        user_exists = check_user_exists(server_ip, username, fresh=data.get('fresh') is True)
         
         return jsonify({
             "status": "success",
@@ -1480,72 +2324,111 @@ def validate_user():
             "error": f"Failed to validate user: {str(e)}"
         }), 500
 
+@app.route('/api/validate_users', methods=['POST'])
+def validate_users():
+    """API endpoint to check whether many users exist on one server"""
+    if 'authenticated' not in session:
+        return jsonify({"error": "Unauthorized"}), 401
+    
+    data = json_payload('server_ip', message="Server IP and username list required")
+    server_ip = data['server_ip']
+    usernames = data.get('usernames')
+    
+    if not isinstance(usernames, list) or not usernames or not all(isinstance(u, str) and u for u in usernames):
+        return jsonify({"error": "Server IP and username list required"}), 400
+    
+    if not os.path.exists(SSH_KEY_PATH):
+        return jsonify({"error": f"SSH key not found at {SSH_KEY_PATH}"}), 500
+    
+    try:
+        return jsonify({
+            "status": "success",
+            "server_ip": server_ip,
+            "results": check_users_exist(server_ip, usernames, fresh=data.get('fresh') is True)
+        })
+    except Exception as e:
+        return jsonify({
+            "status": "error",
+            "error": f"Failed to validate users: {str(e)}"
+        }), 500
+
+@app.route('/api/validate_users_bulk', methods=['POST'])
+def validate_users_bulk():
+    """API endpoint to check whether one user exists on many servers at once"""
+    if 'authenticated' not in session:
+        return jsonify({"error": "Unauthorized"}), 401
+    
+    data = json_payload('username', message="Server IP list and username required")
+    server_ips = data.get('server_ips')
+    username = data['username']
+    
+    if not isinstance(server_ips, list) or not server_ips or not all(isinstance(ip, str) and ip for ip in server_ips):
+        return jsonify({"error": "Server IP list and username required"}), 400
+    
+    if not os.path.exists(SSH_KEY_PATH):
+        return jsonify({"error": f"SSH key not found at {SSH_KEY_PATH}"}), 500
+    
+    def validate(server_ip):
+        try:
+            return {"user_exists": check_user_exists(server_ip, username, fresh=data.get('fresh') is True)}
+        except Exception as e:
+            return {"error": f"Failed to validate user: {str(e)}"}
+    
+    server_ips = list(dict.fromkeys(server_ips))
+    return jsonify({
+        "status": "success",
+        "username": username,
+        "results": dict(zip(server_ips, run_parallel(validate, server_ips)))
+    })
+
 @app.route('/api/change_user_password', methods=['POST'])
 def change_user_password():
-    """API endpoint to change a user's password on a server"""
+    """API endpoint to change a user's password on a server ({"background": true} runs it as a job)"""
     if 'authenticated' not in session:
         return jsonify({"error": "Unauthorized"}), 401
     
-    data = request.get_json()
-    server_ip = data.get('server_ip')
-    username = data.get('username')
-    new_password = data.get('new_password')
-    
-    if not server_ip or not username or not new_password:
-        return jsonify({"error": "Server IP, username, and new password required"}), 400
+    data = json_payload('server_ip', 'username', 'new_password',
+                        message="Server IP, username, and new password required")
+    if data.get('background') is True:
+        # Only the response lands in the job record; the new password stays in this request's memory
+        return start_job(lambda: _change_user_password(data))
+    return _change_user_password(data)
+
+def _change_user_password(data):
+    server_ip = data['server_ip']
+    username = data['username']
+    new_password = data['new_password']
+    # chpasswd's exit status already confirms the change; a password login is opt-in
+    verify = data.get('verify') is True
     
     try:
-        # Test SSH connection
-        ssh = paramiko.SSHClient()
-        ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-        
         # Load private key
         if not os.path.exists(SSH_KEY_PATH):
             return jsonify({"error": f"SSH key not found at {SSH_KEY_PATH}"}), 500
         
-        private_key = paramiko.Ed25519Key.from_private_key_file(SSH_KEY_PATH)
+        # Change user password using chpasswd over a pooled connection to the server
+        app.logger.info("Changing password for %s@%s", username, server_ip)
+        exit_status, output = set_passwords(server_ip, [(username, new_password)])
         
-        # Connect to server
-        ssh.connect(server_ip, username=SSH_USER, pkey=private_key, timeout=15)
-        
-        # Change user password using chpasswd
-        change_password_cmd = f'echo "{username}:{new_password}" | sudo chpasswd'
-        app.logger.info(f"Executing password change command: {change_password_cmd}")
-        stdin, stdout, stderr = ssh.exec_command(change_password_cmd, timeout=30)
-        exit_status = stdout.channel.recv_exit_status()
-        
-        app.logger.info(f"Password change command exit status: {exit_status}")
-        stderr_output = stderr.read().decode()
-        if stderr_output:
-            app.logger.error(f"Password change stderr: {stderr_output}")
+        app.logger.info("Password change command exit status: %s", exit_status)
+        if output.strip():
+            app.logger.error("Password change output: %s", output)
         
         if exit_status == 0:
-            app.logger.info("Password change command succeeded, now verifying...")
+            app.logger.info("Password change command succeeded")
             
             # For root users, skip SSH verification since root SSH login is often disabled
-            if username == 'root':
+            if not verify:
+                password_changed = True
+            elif username == 'root':
                 app.logger.info("Skipping SSH verification for root user (root SSH login typically disabled)")
                 password_changed = True
             else:
-                # Verify the password change worked by testing login for non-root users
-                test_ssh = paramiko.SSHClient()
-                test_ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-                
-                try:
-                    app.logger.info(f"Testing SSH connection with new password for {username}@{server_ip}")
-                    test_ssh.connect(server_ip, username=username, password=new_password, timeout=10)
-                    app.logger.info("SSH connection with new password successful")
-                    test_ssh.close()
-                    password_changed = True
-                except Exception as verify_error:
-                    app.logger.error(f"Password verification failed: {verify_error}")
-                    password_changed = False
+                password_changed = verify_password_login(server_ip, username, new_password)
         else:
-            app.logger.error(f"Password change command failed with exit status {exit_status}")
+            app.logger.error("Password change command failed with exit status %s", exit_status)
             password_changed = False
         
-        ssh.close()
-        
         if password_changed:
             # Update the timestamp for this password
             update_password_timestamp(server_ip, username)
@@ -1597,13 +2480,15 @@ def create_password():
     if 'authenticated' not in session:
         return jsonify({"error": "Unauthorized"}), 401
     
-    data = request.get_json()
-    server = data.get('server')
-    username = data.get('username')
-    password_length = data.get('password_length', 16)
+    data = json_payload('server', 'username', message="Server and username required",
+                        types={'password_length': int})
+    server = data['server']
+    username = data['username']
+    password_length = data.get('password_length') or 16
     
-    if not server or not username:
-        return jsonify({"error": "Server and username required"}), 400
+    # Same bounds as the dashboard's length input
+    if not 8 <= password_length <= 64:
+        return jsonify({"error": "Password length must be between 8 and 64"}), 400
     
     # Generate secure password
     new_password = generate_secure_password(password_length)
@@ -1612,9 +2497,6 @@ def create_password():
     result = create_vault_structure(server, username, new_password)
     
     if result['success']:
-        # Update the timestamp for this password
-        update_password_timestamp(server, username)
-        
         # Log the creation for audit purposes
         log_action(session['username'], 'create', server, username, 'success')
         
@@ -1643,13 +2525,10 @@ def retrieve_password():
     if 'authenticated' not in session:
         return jsonify({"error": "Unauthorized"}), 401
     
-    data = request.get_json()
-    server = data.get('server')
+    data = json_payload('server', message="Server name required")
+    server = data['server']
     username = data.get('username', 'root')
     
-    if not server:
-        return jsonify({"error": "Server name required"}), 400
-    
     result = retrieve_password_from_vault(server, username)
     
     if result['success']:
@@ -1675,8 +2554,14 @@ def get_passwords():
     if 'authenticated' not in session:
         return jsonify({"error": "Unauthorized"}), 401
     
-    result = list_all_passwords()
-    return jsonify(result)
+    # Creating a password or timestamp file moves VAULT_DIR's mtime; adding or removing a server can
+    # change how entry names split into server and username
+    etag = version_etag(password_listing_version())
+    response = conditional_json(etag, list_all_passwords)
+    if response.status_code == 200 and etag:
+        # The listing may itself have added missing timestamp files
+        response.set_etag(version_etag(password_listing_version()), weak=True)
+    return response
 
 @app.route('/api/health_check', methods=['POST'])
 def health_check():
@@ -1684,15 +2569,13 @@ def health_check():
     if 'authenticated' not in session:
         return jsonify({"error": "Unauthorized"}), 400
 
-    data = request.get_json()
-    server_ip = data.get('server_ip')
+    data = json_payload('server_ip', message="Server IP required")
+    server_ip = data['server_ip']
     server_name = data.get('server_name', 'Unknown')
     
-    if not server_ip:
-        return jsonify({"error": "Server IP required"}), 400
-    
     try:
-        health_result = perform_health_check(server_ip, server_name)
+        # ?fresh=1 runs a new check instead of one up to HEALTH_CACHE_TTL seconds old
+        health_result = perform_health_check(server_ip, server_name, fresh=request.args.get('fresh') == '1')
         return jsonify({
             "success": True,
             "health_data": health_result
@@ -1703,6 +2586,21 @@ def health_check():
             "error": f"Health check failed: {str(e)}"
         }), 500
 
+def server_status(health_result):
+    """Map a health check result to the dashboard status stored in SERVERS_FILE"""
+    return {'healthy': 'online', 'degraded': 'degraded'}.get(health_result['overall_status'], 'offline')
+
+def health_summary(health_results):
+    """Count health check results by overall status in a single pass"""
+    counts = Counter(result['overall_status'] for result in health_results)
+    return {
+        "healthy": counts['healthy'],
+        "degraded": counts['degraded'],
+        "unhealthy": counts['unhealthy'],
+        # Everything the status update marks offline - 'unhealthy' and 'error' alike
+        "offline": len(health_results) - counts['healthy'] - counts['degraded']
+    }
+
 @app.route('/api/health_check_all', methods=['POST'])
 def health_check_all():
     """API endpoint to perform health check on all servers"""
@@ -1710,33 +2608,28 @@ def health_check_all():
         return jsonify({"error": "Unauthorized"}), 400
 
     try:
-        servers = load_servers()
-        all_health_results = []
-        
-        for server in servers:
-            health_result = perform_health_check(server['ip'], server['name'])
-            all_health_results.append(health_result)
-            
-            # Update server status based on health check
-            if health_result['overall_status'] == 'healthy':
-                server['status'] = 'online'
-            elif health_result['overall_status'] == 'degraded':
-                server['status'] = 'degraded'
-            else:
-                server['status'] = 'offline'
-        
-        # Save updated server statuses
-        save_servers(servers)
+        servers = load_servers(copy=False)
+        fresh = request.args.get('fresh') == '1'
+        
+        # Every server is checked at once - the request takes about as long as the slowest host
+        all_health_results = run_parallel(lambda server: perform_health_check(server['ip'], server['name'], fresh=fresh), servers)
+        
+        # Update server status based on health check (servers added or removed meanwhile are kept as they are)
+        status_by_name = {server['name']: server_status(health_result)
+                          for server, health_result in zip(servers, all_health_results)}
+        with updating_servers() as updated:
+            for server in updated:
+                if server['name'] in status_by_name:
+                    server['status'] = status_by_name[server['name']]
+            # Save updated server statuses
+            save_servers(updated)
         
         return jsonify({
             "success": True,
             "health_results": all_health_results,
             "summary": {
                 "total_servers": len(servers),
-                "healthy": len([s for s in all_health_results if s['overall_status'] == 'healthy']),
-                "degraded": len([s for s in all_health_results if s['overall_status'] == 'degraded']),
-                "unhealthy": len([s for s in all_health_results if s['overall_status'] == 'unhealthy']),
-                "offline": len([s for s in all_health_results if s['overall_status'] == 'unhealthy'])
+                **health_summary(all_health_results)
             }
         })
     except Exception as e:
@@ -1751,47 +2644,38 @@ def health_check_targeted():
     if 'authenticated' not in session:
         return jsonify({"error": "Unauthorized"}), 400
 
-    data = request.get_json()
+    data = json_payload()
     target_servers = data.get('servers', [])
     
     if not target_servers:
         return jsonify({"error": "No servers specified"}), 400
     
     try:
-        all_health_results = []
+        fresh = request.args.get('fresh') == '1'
         
-        for server_data in target_servers:
-            server_ip = server_data.get('ip')
-            server_name = server_data.get('server', 'Unknown')
-            
-            if server_ip:
-                health_result = perform_health_check(server_ip, server_name)
-                all_health_results.append(health_result)
+        # Check the requested servers concurrently, keeping the order they were given in
+        targets = [(server_data.get('ip'), server_data.get('server', 'Unknown'))
+                   for server_data in target_servers if server_data.get('ip')]
+        all_health_results = run_parallel(lambda target: perform_health_check(*target, fresh=fresh), targets)
         
+        # One lookup per server; reversed so the first result for a repeated IP wins, as before
+        status_by_ip = {result['ip']: server_status(result) for result in reversed(all_health_results)}
         # Update server statuses in the stored servers list
-        servers = load_servers()
-        for i, server in enumerate(servers):
-            for health_result in all_health_results:
-                if server['ip'] == health_result['ip']:
-                    if health_result['overall_status'] == 'healthy':
-                        servers[i]['status'] = 'online'
-                    elif health_result['overall_status'] == 'degraded':
-                        servers[i]['status'] = 'degraded'
-                    else:
-                        servers[i]['status'] = 'offline'
-                    break
-        
-        # Save updated server statuses
-        save_servers(servers)
+        with updating_servers() as servers:
+            for server in servers:
+                status = status_by_ip.get(server['ip'])
+                if status is not None:
+                    server['status'] = status
+            
+            # Save updated server statuses
+            save_servers(servers)
         
         return jsonify({
             "success": True,
             "health_results": all_health_results,
             "summary": {
                 "total_checked": len(all_health_results),
-                "healthy": len([s for s in all_health_results if s['overall_status'] == 'healthy']),
-                "degraded": len([s for s in all_health_results if s['overall_status'] == 'degraded']),
-                "unhealthy": len([s for s in all_health_results if s['overall_status'] == 'unhealthy'])
+                **health_summary(all_health_results)
             }
         })
     except Exception as e:
@@ -1806,30 +2690,48 @@ def debug_connectivity():
     if 'authenticated' not in session:
         return jsonify({"error": "Unauthorized"}), 400
 
-    data = request.get_json()
-    ip_address = data.get('ip_address')
+    data = json_payload('ip_address', message="IP address required")
+    ip_address = data['ip_address']
     
-    if not ip_address:
-        return jsonify({"error": "IP address required"}), 400
+    app.logger.debug("Debug connectivity test for %s", ip_address)
     
-    print(f"Debug connectivity test for {ip_address}")
+    # Test ping directly - in-process ICMP echo first, then the SSH port; neither forks a process
+    icmp_error = None
+    try:
+        reachable, method = icmp_ping(ip_address, 3), "icmp"
+    except OSError as e:
+        # ICMP sockets not allowed for this user (net.ipv4.ping_group_range), or the name did not resolve
+        app.logger.debug("In-process ping unavailable for %s: %s", ip_address, e)
+        reachable, method, icmp_error = False, None, e
+    if not reachable and test_ssh_port(ip_address, 22, 3):
+        reachable, method = True, "port 22"
+    
+    if reachable or icmp_error is None or not PING_FALLBACK:
+        app.logger.debug("Direct ping result for %s: %s via %s", ip_address, reachable, method)
+        return jsonify({
+            "ping_returncode": 0 if reachable else 1,
+            "ping_stdout": "",
+            "ping_stderr": "" if icmp_error is None else str(icmp_error),
+            "ping_success": reachable,
+            "method": method
+        })
     
-    # Test ping directly
     try:
-        result = subprocess.run(['/usr/bin/ping', '-c', '1', '-W', '3', ip_address], 
-                              capture_output=True, text=True, timeout=7)
-        print(f"Direct ping result: returncode={result.returncode}")
-        print(f"Direct ping stdout: {result.stdout}")
-        print(f"Direct ping stderr: {result.stderr}")
+        result = subprocess.run([ping_command(), '-c', '1', '-W', '3', ip_address], 
+                              capture_output=True, text=True, timeout=7, close_fds=False)
+        app.logger.debug("Direct ping result: returncode=%s", result.returncode)
+        app.logger.debug("Direct ping stdout: %s", result.stdout)
+        app.logger.debug("Direct ping stderr: %s", result.stderr)
         
         return jsonify({
             "ping_returncode": result.returncode,
             "ping_stdout": result.stdout,
             "ping_stderr": result.stderr,
-            "ping_success": result.returncode == 0
+            "ping_success": result.returncode == 0,
+            "method": "ping"
         })
     except Exception as e:
-        print(f"Direct ping error: {e}")
+        app.logger.debug("Direct ping error: %s", e)
         return jsonify({"error": str(e)}), 500
 
 @app.route('/api/debug_ssh', methods=['POST'])
@@ -1838,40 +2740,36 @@ def debug_ssh():
     if 'authenticated' not in session:
         return jsonify({"error": "Unauthorized"}), 400
 
-    data = request.get_json()
-    ip_address = data.get('ip_address')
+    data = json_payload('ip_address', message="IP address required")
+    ip_address = data['ip_address']
     username = data.get('username', 'brian')
     
-    if not ip_address:
-        return jsonify({"error": "IP address required"}), 400
-    
-    print(f"Debug SSH test for {username}@{ip_address}")
+    app.logger.debug("Debug SSH test for %s@%s", username, ip_address)
     
     # Test SSH connection directly
     try:
-        from config import SSH_KEY_PATH
         result = test_ssh_connection(ip_address, username, SSH_KEY_PATH, timeout=15)
-        print(f"SSH test result: {result}")
+        app.logger.debug("SSH test result: %s", result)
         
         return jsonify(result)
     except Exception as e:
-        print(f"SSH test error: {e}")
+        app.logger.debug("SSH test error: %s", e)
         return jsonify({"error": str(e)}), 500
 
 @app.route('/api/retry_server_setup/<hostname>')
 def retry_server_setup(hostname):
-    """Retry SSH setup for a server that failed initial setup"""
+    """Retry SSH setup for a server that failed initial setup (?background=1 runs it as a job)"""
     if 'authenticated' not in session:
         return jsonify({"error": "Unauthorized"}), 400
     
+    if request.args.get('background') == '1':
+        return start_job(lambda: _retry_server_setup(hostname))
+    return _retry_server_setup(hostname)
+
+def _retry_server_setup(hostname):
     try:
         # Find the server in the servers list
-        servers = load_servers()
-        server = None
-        for s in servers:
-            if s.get('name') == hostname:
-                server = s
-                break
+        server = find_server(load_servers(fresh=True, copy=False), hostname)
         
         if not server:
             return jsonify({"error": f"Server {hostname} not found"}), 404
@@ -1885,13 +2783,13 @@ def retry_server_setup(hostname):
         setup_result = try_direct_ssh_setup(server['ip'], hostname)
         
         if setup_result['success']:
-            # Update server status to connected
-            for s in servers:
-                if s.get('name') == hostname:
-                    s['ssh_status'] = 'connected'
-                    s['setup_required'] = False
-                    break
-            save_servers(servers)
+            # Update server status to connected (unless it was removed while setup ran)
+            with updating_servers() as servers:
+                server = find_server(servers, hostname)
+                if server:
+                    server['ssh_status'] = 'connected'
+                    server['setup_required'] = False
+                    save_servers(servers)
             
             return jsonify({
                 "success": True,
@@ -1914,28 +2812,25 @@ def change_admin_password():
     if 'authenticated' not in session:
         return jsonify({"error": "Unauthorized"}), 400
     
-    data = request.get_json()
-    current_password = data.get('current_password')
-    new_password = data.get('new_password')
+    data = json_payload('current_password', 'new_password', message="Current and new password required")
+    current_password = data['current_password']
+    new_password = data['new_password']
     
-    if not current_password or not new_password:
-        return jsonify({"error": "Current and new password required"}), 400
-    
-    # Validate current password (hardcoded for demo - in production use proper auth)
-    if current_password != "admin123":
+    # Validate current password
+    if not check_password_hash(admin_password_hash(), current_password):
         return jsonify({"error": "Current password is incorrect"}), 400
     
     # Validate new password
     if len(new_password) < 8:
         return jsonify({"error": "New password must be at least 8 characters long"}), 400
     
-    # In production, you would:
-    # 1. Hash the new password
-    # 2. Store it in a secure database
-    # 3. Update the authentication system
-    
-    # For now, we'll just return success
-    # TODO: Implement actual password storage and update mechanism
+    # Only the salted hash is stored, readable by the service user alone
+    try:
+        os.makedirs(os.path.dirname(ADMIN_PASSWORD_FILE), exist_ok=True)
+        atomic_write(ADMIN_PASSWORD_FILE, generate_password_hash(new_password).encode(), mode=0o600)
+    except OSError as e:
+        app.logger.error("Failed to store admin password: %s", e)
+        return jsonify({"error": "Failed to store the new password"}), 500
     
     log_action(session['username'], 'change_admin_password', 'system', 'admin', 'success')
     
@@ -1944,23 +2839,142 @@ def change_admin_password():
         "message": "Password changed successfully. Please log in with your new password."
     })
 
+def init_app():
+    """One-time startup work, run before gunicorn forks workers (see gunicorn_conf.py)"""
+    # Fail fast on bad settings instead of on the first vault or SSH request
+    validate_config()
+    # Debug output stays off in production at the cost of a level check (LOCKR_LOG_LEVEL=DEBUG enables it)
+    app.logger.setLevel(LOG_LEVEL)
+    ensure_dirs()
+    # Prime the servers.json snapshot so forked workers share it copy-on-write
+    load_servers()
+    warm_up()
+
+def warm_up():
+    """Do the lazy first-use work of SSH and ping once, so no request pays it (errors are ignored)"""
+    try:
+        # Resolve the external commands; the SSH key is left to each worker, since a gunicorn HUP
+        # forks new workers from this (preloaded) process without re-running init_app()
+        ping_command()
+        vault_command()
+        # An unstarted Transport pulls in paramiko's kex/cipher modules and the OpenSSL backend, no thread
+        local, remote = socket.socketpair()
+        with local, remote:
+            paramiko.Transport(local).close()
+    except Exception as e:
+        app.logger.debug("Warm-up skipped: %s", e)
+
+def reload_keys(signum=None, frame=None):
+    """Re-read the SSH and vault keys on next use (SIGHUP / systemctl reload)"""
+    reset_ssh_pkey()
+    _load_private_key_file.cache_clear()
+    _read_public_key_file.cache_clear()
+    _load_vault_secret.cache_clear()
+    clear_vault_cache()
+    # Sessions authenticated with the old key are dropped too
+    ssh_pool.close_all()
+    app.logger.info("SSH and vault keys will be reloaded on next use")
+
+@lru_cache(maxsize=1)
+def _iso_second(second):
+    return datetime.fromtimestamp(second).isoformat()
+
+def now_iso():
+    """Current local time in ISO 8601 to the second, formatted at most once per second"""
+    return _iso_second(int(time.time()))
+
+# Audit entries are written by one thread per worker, so requests never wait on log I/O
+_audit_queue = None
+_audit_thread = None
+_audit_pid = None
+_audit_dropped = 0
+_audit_lock = threading.Lock()
+
+def _audit_file_handler():
+    """A handler appending to AUDIT_LOG_FILE, or None if it is not set"""
+    if not AUDIT_LOG_FILE:
+        return None
+    # Every worker appends to the same file, so rotation is left to logrotate; the handler reopens a moved file
+    handler = logging.handlers.WatchedFileHandler(AUDIT_LOG_FILE, delay=True)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    return handler
+
+# log_action() queues plain tuples in this order; the writer turns them into audit entries
+AUDIT_FIELDS = ("timestamp", "user", "action", "server", "target_user", "status", "ip")
+
+def audit_json(entry):
+    """Serialize an audit entry with orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(entry).decode()
+    return json.dumps(entry)
+
+def _audit_writer(entries):
+    """Log queued audit entries until None arrives"""
+    global _audit_dropped
+    audit_file = _audit_file_handler()
+    while True:
+        item = entries.get()
+        if item is None:
+            if audit_file is not None:
+                audit_file.close()
+            return
+        entry = dict(zip(AUDIT_FIELDS, item))
+        entry["timestamp"] = _iso_second(int(entry["timestamp"]))
+        if _audit_dropped:
+            with _audit_lock:
+                dropped, _audit_dropped = _audit_dropped, 0
+            app.logger.warning("Audit queue full - dropped %d ACTION_LOG entries", dropped)
+        # Fields also ride on the record (extra=) for structured formatters; the JSON text is built only if logged
+        to_app_log = app.logger.isEnabledFor(logging.INFO)
+        if audit_file is None and not to_app_log:
+            continue
+        text = audit_json(entry)
+        if audit_file is not None:
+            # The audit file keeps every entry whatever LOG_LEVEL is
+            audit_file.handle(logging.makeLogRecord({"msg": text, "levelno": logging.INFO,
+                                                     "levelname": "INFO", "name": "lockr.audit"}))
+        if to_app_log:
+            app.logger.info("ACTION_LOG: %s", text, extra=entry)
+
+def _audit_entries():
+    """This process's audit queue, starting its writer on first use (and again in each forked worker)"""
+    global _audit_queue, _audit_thread, _audit_pid
+    if _audit_pid != os.getpid():
+        with _audit_lock:
+            if _audit_pid != os.getpid():
+                _audit_queue = queue.Queue(maxsize=AUDIT_QUEUE_SIZE)
+                _audit_thread = threading.Thread(target=_audit_writer, args=(_audit_queue,),
+                                                 name="lockr-audit", daemon=True)
+                _audit_thread.start()
+                _audit_pid = os.getpid()
+    return _audit_queue
+
+@atexit.register
+def flush_audit_log(timeout=5):
+    """Write out queued audit entries before the process exits"""
+    if _audit_pid == os.getpid():
+        try:
+            _audit_queue.put(None, timeout=timeout)
+        except queue.Full:
+            return
+        _audit_thread.join(timeout)
+
 def log_action(user, action, server, target_user, status):
-    """Log actions for audit purposes"""
-    log_entry = {
-        "timestamp": datetime.now().isoformat(),
-        "user": user,
-        "action": action,
-        "server": server,
-        "target_user": target_user,
-        "status": status,
-        "ip": request.remote_addr
-    }
+    """Queue an audit log entry (dropped and counted if the writer has fallen AUDIT_QUEUE_SIZE behind)"""
+    global _audit_dropped
+    # Only a tuple is built here; formatting the time and the JSON is left to the writer thread
+    log_entry = (time.time(), user, action, server, target_user, status, request.remote_addr)
     
-    # In production, log to a proper logging system
-    print(f"ACTION_LOG: {json.dumps(log_entry)}")
+    try:
+        _audit_entries().put_nowait(log_entry)
+    except queue.Full:
+        with _audit_lock:
+            _audit_dropped += 1
 
 if __name__ == '__main__':
-    # Ensure vault directory exists
-    os.makedirs(VAULT_DIR, exist_ok=True)
+    # Development server - use gunicorn with gunicorn_conf.py in production
+    init_app()
+    # lockr.service's ExecReload sends SIGHUP; without a handler it would stop the process
+    signal.signal(signal.SIGHUP, reload_keys)
     
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    app.run(host=WEB_HOST, port=WEB_PORT, debug=WEB_DEBUG, use_reloader=WEB_USE_RELOADER)
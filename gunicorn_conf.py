@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+"""
+Lockr Gunicorn Configuration
+Production runner: gunicorn -c gunicorn_conf.py
+"""
+
+from config import (WEB_HOST, WEB_PORT, WEB_WORKERS, WEB_WORKER_CLASS, WEB_THREADS,
+                    WEB_TIMEOUT, WEB_PRELOAD_APP, LOG_LEVEL)
+
+wsgi_app = "wsgi:app"
+bind = f"{WEB_HOST}:{WEB_PORT}"
+
+# Few processes, many threads: each worker keeps its own SSH pool and caches,
+# and handlers spend their time blocked on SSH/socket I/O that releases the GIL.
+workers = WEB_WORKERS
+worker_class = WEB_WORKER_CLASS
+threads = WEB_THREADS
+
+# Server setup runs a remote script for up to SCRIPT_TIMEOUT seconds
+timeout = WEB_TIMEOUT
+
+loglevel = LOG_LEVEL.lower()
+
+# Import the app once in the master so workers share it copy-on-write.
+# This also gives every worker the same Flask secret key, so sessions
+# survive being served by a different worker.
+# wsgi.py runs init_app() on import, i.e. once in the master when preloading.
+# gevent workers monkey-patch after the fork, which an app (and its locks and
+# threads) already loaded in the unpatched master does not survive, so each
+# gevent worker loads the app itself.
+preload_app = WEB_PRELOAD_APP and WEB_WORKER_CLASS != "gevent"
@@ -0,0 +1,18 @@
+#!/usr/bin/env python3
+"""
+Point every Lockr path at a scratch directory before any test imports config
+"""
+
+import os
+import tempfile
+
+_SCRATCH = tempfile.mkdtemp(prefix="lockr-tests-")
+
+for name, path in {
+    "VAULT_DIR": "vault",
+    "VAULT_KEY": ".vault_key",
+    "SERVERS_FILE": "servers.json",
+    "ADMIN_PASSWORD_FILE": ".lockr_admin",
+}.items():
+    os.environ.setdefault(f"LOCKR_{name}", os.path.join(_SCRATCH, path))
+os.environ.setdefault("LOCKR_SKIP_PATH_CHECK", "1")
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+JSON API: weak ETag revalidation and request body validation
+"""
+
+import pytest
+
+import enhanced_unified_manager as lockr
+
+SERVERS = [{"name": "web", "ip": "192.0.2.10", "status": "online", "last_access": "2024-08-30 14:30"}]
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    servers_file = tmp_path / "servers.json"
+    servers_file.write_bytes(lockr.servers_json_dumps(SERVERS))
+    (tmp_path / "vault").mkdir()
+    monkeypatch.setattr(lockr, "SERVERS_FILE", str(servers_file))
+    monkeypatch.setattr(lockr, "VAULT_DIR", str(tmp_path / "vault"))
+    monkeypatch.setattr(lockr, "_servers_snapshot", None)
+    monkeypatch.setattr(lockr, "_servers_file_content", None)
+    monkeypatch.setattr(lockr, "_password_listing", None)
+    client = lockr.app.test_client()
+    with client.session_transaction() as session:
+        session["authenticated"] = True
+        session["username"] = "admin"
+    return client
+
+
+def revalidate(client, url, etag):
+    return client.get(url, headers={"If-None-Match": f'W/"{etag}"'})
+
+
+@pytest.mark.parametrize("url", ["/api/servers", "/api/list_passwords"])
+def test_unchanged_resource_answers_304(client, url):
+    first = client.get(url)
+    assert first.status_code == 200
+    etag, weak = first.get_etag()
+    assert etag and weak
+    assert first.cache_control.no_cache and first.cache_control.private
+
+    second = revalidate(client, url, etag)
+    assert second.status_code == 304
+    assert second.data == b""
+    assert second.get_etag() == (etag, True)
+
+
+def test_changed_server_list_gets_a_new_etag(client):
+    etag, _ = client.get("/api/servers").get_etag()
+    with lockr.updating_servers() as servers:
+        servers.append({"name": "db", "ip": "192.0.2.11", "status": "offline"})
+        lockr.save_servers(servers)
+
+    response = revalidate(client, "/api/servers", etag)
+    assert response.status_code == 200
+    assert response.get_etag()[0] != etag
+    assert [server["name"] for server in response.get_json()["servers"]] == ["web", "db"]
+
+
+def test_password_listing_etag_follows_vault_and_servers(client):
+    etag, _ = client.get("/api/list_passwords").get_etag()
+    lockr.update_password_timestamp("web", "root")
+    after_vault_change = revalidate(client, "/api/list_passwords", etag)
+    assert after_vault_change.status_code == 200
+
+    etag, _ = after_vault_change.get_etag()
+    with lockr.updating_servers() as servers:
+        servers.append({"name": "db", "ip": "192.0.2.11", "status": "offline"})
+        lockr.save_servers(servers)
+    assert revalidate(client, "/api/list_passwords", etag).status_code == 200
+
+
+def test_unauthenticated_requests_are_refused(client):
+    with client.session_transaction() as session:
+        session.clear()
+    assert client.get("/api/servers").status_code == 401
+
+
+@pytest.mark.parametrize("body", ["[1, 2]", '"web"', "5", "null", "{not json"])
+@pytest.mark.parametrize("url", ["/api/remove_server", "/api/create_password", "/api/status"])
+def test_non_object_body_is_a_400(client, url, body):
+    response = client.post(url, data=body, content_type="application/json")
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "JSON object body required"}
+
+
+def test_missing_or_empty_required_field(client):
+    for body in ({}, {"server": "web"}, {"server": "web", "username": ""}, {"server": "web", "username": 7}):
+        response = client.post("/api/create_password", json=body)
+        assert response.status_code == 400
+        assert response.get_json() == {"error": "Server and username required"}
+
+
+def test_typed_field_is_converted_or_rejected(client):
+    response = client.post("/api/create_password", json={"server": "web", "username": "root", "password_length": "abc"})
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "password_length must be int"}
+
+    # "4" is converted, then fails the endpoint's own range check
+    response = client.post("/api/create_password", json={"server": "web", "username": "root", "password_length": "4"})
+    assert response.status_code == 400
+    assert "between 8 and 64" in response.get_json()["error"]
+
+
+def test_batch_status_without_body_checks_every_server(client, monkeypatch):
+    probed = []
+    monkeypatch.setattr(lockr, "probe_server", lambda address, fresh=False: probed.append(address) or {})
+    response = client.post("/api/status")
+    assert response.status_code == 200
+    assert probed == ["192.0.2.10"]
+    assert list(response.get_json()["results"]) == ["web"]
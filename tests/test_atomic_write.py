@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+atomic_write(): whole-file replacement, with disk flushes only for durable writes
+"""
+
+import os
+import threading
+
+import pytest
+
+import enhanced_unified_manager as lockr
+
+
+@pytest.fixture
+def fsyncs(monkeypatch):
+    calls = []
+    real_fsync = os.fsync
+
+    def counting_fsync(fd):
+        calls.append(fd)
+        real_fsync(fd)
+
+    monkeypatch.setattr(os, "fsync", counting_fsync)
+    return calls
+
+
+def test_durable_write_syncs_file_and_directory(tmp_path, fsyncs):
+    path = tmp_path / "servers.json"
+    lockr.atomic_write(str(path), b"old")
+    lockr.atomic_write(str(path), b"new", mode=0o600)
+    assert path.read_bytes() == b"new"
+    assert path.stat().st_mode & 0o777 == 0o600
+    assert len(fsyncs) == 4
+    assert os.listdir(tmp_path) == ["servers.json"]
+
+
+def test_non_durable_write_skips_flushes(tmp_path, fsyncs):
+    path = tmp_path / "web_root_timestamp"
+    lockr.atomic_write(str(path), b"2024-08-30 14:30:00", durable=False)
+    assert path.read_bytes() == b"2024-08-30 14:30:00"
+    assert fsyncs == []
+
+
+def test_planted_temp_symlink_is_not_followed(tmp_path):
+    victim = tmp_path / "victim"
+    victim.write_bytes(b"untouched")
+    path = tmp_path / ".lockr_admin"
+    os.symlink(victim, f"{path}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+    with pytest.raises(FileExistsError):
+        lockr.atomic_write(str(path), b"hash", mode=0o600)
+    assert victim.read_bytes() == b"untouched"
+    assert not path.exists()
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+config.py: malformed LOCKR_<NAME> overrides are reported by validate_config(), not raised on import
+"""
+
+import pytest
+
+import config
+
+
+def override(monkeypatch, name, raw):
+    """Set LOCKR_<name> and have config resolve it again (the original value is restored afterwards)"""
+    getattr(config, name)
+    monkeypatch.delitem(vars(config), name)
+    monkeypatch.setenv(f"LOCKR_{name}", raw)
+
+
+def test_malformed_overrides_are_reported_together(monkeypatch):
+    monkeypatch.setattr(config, "_COERCE_ERRORS", {})
+    override(monkeypatch, "WEB_PORT", "abc")
+    override(monkeypatch, "SSH_TIMEOUT", "1.5")
+    override(monkeypatch, "PING_FALLBACK", "maybe")
+    override(monkeypatch, "LOG_LEVEL", "LOUD")
+
+    # Reading a malformed setting keeps its default instead of raising
+    assert config.WEB_PORT == 5000
+
+    with pytest.raises(ValueError) as excinfo:
+        config.validate_config(check_paths=False)
+    message = str(excinfo.value)
+    assert "WEB_PORT must be an integer, got 'abc'" in message
+    assert "SSH_TIMEOUT must be an integer, got '1.5'" in message
+    assert "PING_FALLBACK must be a boolean" in message
+    assert "LOG_LEVEL must be one of" in message
+
+
+def test_well_formed_overrides_are_converted(monkeypatch):
+    monkeypatch.setattr(config, "_COERCE_ERRORS", {})
+    override(monkeypatch, "WEB_PORT", "8080")
+    override(monkeypatch, "PING_FALLBACK", "off")
+
+    assert config.WEB_PORT == 8080
+    assert config.PING_FALLBACK is False
+    config.validate_config(check_paths=False)
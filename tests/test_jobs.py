@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Background jobs: a record left "running" by a worker that no longer exists is reported as failed
+"""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+import enhanced_unified_manager as lockr
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(lockr, "JOBS_DIR", str(tmp_path))
+    client = lockr.app.test_client()
+    with client.session_transaction() as session:
+        session["authenticated"] = True
+    return client
+
+
+def write_record(job_id, **record):
+    lockr.atomic_write(lockr.job_path(job_id), lockr.json_dumps({"job_id": job_id, **record}))
+
+
+def exited_pid():
+    proc = subprocess.Popen([sys.executable, "-c", "pass"])
+    proc.wait()
+    return proc.pid
+
+
+def test_running_job_of_live_worker(client):
+    job_id = "a" * 32
+    write_record(job_id, status="running", pid=os.getpid())
+    assert client.get(f"/api/jobs/{job_id}").get_json()["status"] == "running"
+
+
+def test_running_job_of_exited_worker_fails(client):
+    job_id = "b" * 32
+    write_record(job_id, status="running", pid=exited_pid())
+    job = client.get(f"/api/jobs/{job_id}").get_json()
+    assert job["status"] == "failed"
+    assert job["error"]
+
+
+def test_malformed_and_unknown_job_ids(client):
+    assert client.get("/api/jobs/not-a-job").status_code == 404
+    assert client.get(f"/api/jobs/{'c' * 32}").status_code == 404
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Password generation: block-drawn random indices, class coverage and the Fisher-Yates shuffle
+"""
+
+from collections import Counter
+
+import pytest
+
+import enhanced_unified_manager as lockr
+
+
+def test_random_indices_stay_below_each_bound():
+    bounds = [1, 2, 3, 26, 88, 255, 256, 257, 1000, 65536] * 50
+    for bound, index in zip(bounds, lockr.random_indices(bounds)):
+        assert 0 <= index < bound
+
+
+def test_random_indices_reach_every_value():
+    # 7 needs a 3-bit mask, so one draw in eight is rejected - every index must still come up
+    counts = Counter(lockr.random_indices([7] * 7000))
+    assert sorted(counts) == list(range(7))
+    # Far looser than chance allows (expected 1000 each), but catches a skewed or stuck draw
+    assert all(700 < count < 1300 for count in counts.values())
+
+
+@pytest.mark.parametrize("length", [8, 16, 64])
+def test_password_length_and_character_classes(length):
+    for _ in range(200):
+        password = lockr.generate_secure_password(length)
+        assert len(password) == length
+        assert set(password) <= set(lockr.PASSWORD_ALPHABET)
+        for chars in lockr.PASSWORD_CLASSES:
+            assert any(c in chars for c in password)
+
+
+def test_shuffle_moves_the_class_picks():
+    # Unshuffled, every password would start with its lowercase pick
+    first_classes = {
+        next(i for i, chars in enumerate(lockr.PASSWORD_CLASSES) if password[0] in chars)
+        for password in (lockr.generate_secure_password(8) for _ in range(500))
+    }
+    assert first_classes == set(range(len(lockr.PASSWORD_CLASSES)))
+
+
+def test_passwords_differ():
+    assert len({lockr.generate_secure_password(16) for _ in range(1000)}) == 1000
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+servers.json updates: concurrent read-modify-write blocks in one worker must not lose each other's change
+"""
+
+import threading
+import time
+
+import pytest
+
+import enhanced_unified_manager as lockr
+
+
+@pytest.fixture
+def servers_file(tmp_path, monkeypatch):
+    path = str(tmp_path / "servers.json")
+    monkeypatch.setattr(lockr, "SERVERS_FILE", path)
+    monkeypatch.setattr(lockr, "_servers_snapshot", None)
+    monkeypatch.setattr(lockr, "_servers_file_content", None)
+    with open(path, "wb") as f:
+        f.write(lockr.servers_json_dumps([]))
+    return path
+
+
+def test_concurrent_updates_keep_every_server(servers_file):
+    def add(name):
+        with lockr.updating_servers() as servers:
+            time.sleep(0.01)  # widen the window between loading the list and saving it
+            servers.append({"name": name, "ip": "192.0.2.1", "status": "online"})
+            lockr.save_servers(servers)
+
+    threads = [threading.Thread(target=add, args=(f"server{i}",)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    with open(servers_file, "rb") as f:
+        saved = lockr.servers_json_loads(f.read())
+    assert sorted(server["name"] for server in saved) == [f"server{i}" for i in range(8)]
+
+
+def test_unchanged_list_is_not_rewritten(servers_file):
+    with lockr.updating_servers() as servers:
+        servers.append({"name": "web", "ip": "192.0.2.2", "status": "online"})
+        assert lockr.save_servers(servers)
+    version = lockr.file_version(servers_file)
+
+    with lockr.updating_servers() as servers:
+        assert lockr.save_servers(servers)
+    assert lockr.file_version(servers_file) == version
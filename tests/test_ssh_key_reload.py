@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+SSH key rotation: a worker forked from a process that already parsed
+SSH_KEY_PATH (gunicorn with preload_app) must use the key now on disk, and
+lockr.service's reload signal must reach the process serving requests
+"""
+
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+import paramiko
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
+
+import config
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def write_key(path):
+    """Write a new OpenSSH Ed25519 private key to path (replacing any old one) and return its fingerprint"""
+    pem = Ed25519PrivateKey.generate().private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.OpenSSH, serialization.NoEncryption())
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(pem)
+    os.replace(tmp_path, path)
+    return paramiko.Ed25519Key.from_private_key_file(path).get_fingerprint()
+
+
+def test_forked_worker_loads_rotated_key(tmp_path, monkeypatch):
+    key_path = str(tmp_path / "id_ed25519")
+    monkeypatch.setattr(config, "SSH_KEY_PATH", key_path)
+    monkeypatch.setattr(config, "_PKEY", None)
+
+    old_fingerprint = write_key(key_path)
+    # The "master" parses the key before forking
+    assert config.get_ssh_pkey().get_fingerprint() == old_fingerprint
+
+    new_fingerprint = write_key(key_path)
+    assert new_fingerprint != old_fingerprint
+
+    pid = os.fork()
+    if pid == 0:
+        # The "worker": report through the exit status, never return into pytest
+        try:
+            os._exit(0 if config.get_ssh_pkey().get_fingerprint() == new_fingerprint else 1)
+        except BaseException:
+            os._exit(2)
+    _, status = os.waitpid(pid, 0)
+    assert os.WIFEXITED(status) and os.WEXITSTATUS(status) == 0
+
+
+def test_unchanged_key_is_parsed_once(tmp_path, monkeypatch):
+    key_path = str(tmp_path / "id_ed25519")
+    monkeypatch.setattr(config, "SSH_KEY_PATH", key_path)
+    monkeypatch.setattr(config, "_PKEY", None)
+
+    write_key(key_path)
+    assert config.get_ssh_pkey() is config.get_ssh_pkey()
+
+
+def unit_environment():
+    """The LOCKR_* variables lockr.service sets"""
+    env = {}
+    with open(os.path.join(REPO_DIR, "lockr.service")) as f:
+        for line in f:
+            if line.startswith("Environment=LOCKR_"):
+                name, _, value = line.strip()[len("Environment="):].partition("=")
+                env[name] = value
+    return env
+
+
+def wait_until_serving(url, proc, timeout=20):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        assert proc.poll() is None, "server exited during startup"
+        try:
+            with urllib.request.urlopen(url, timeout=1) as response:
+                return response.status
+        except OSError:
+            time.sleep(0.1)
+    raise AssertionError(f"{url} did not answer within {timeout}s")
+
+
+def test_service_reload_signal_reaches_serving_process(tmp_path):
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    env = dict(os.environ, **unit_environment())
+    env.update(
+        INVOCATION_ID="0" * 32,  # set by systemd for every service
+        LOCKR_WEB_HOST="127.0.0.1",
+        LOCKR_WEB_PORT=str(port),
+        LOCKR_SKIP_PATH_CHECK="1",
+        LOCKR_VAULT_DIR=str(tmp_path / "vault"),
+        LOCKR_SERVERS_FILE=str(tmp_path / "servers.json"),
+        LOCKR_ADMIN_PASSWORD_FILE=str(tmp_path / ".lockr_admin"),
+        LOCKR_DEFAULT_PASSWORD_HASH="unused",
+    )
+    env.pop("WERKZEUG_RUN_MAIN", None)
+    log_path = tmp_path / "server.log"
+    url = f"http://127.0.0.1:{port}/login"
+
+    # The unit's ExecStart, so $MAINPID is proc.pid
+    with open(log_path, "wb") as log:
+        proc = subprocess.Popen([sys.executable, os.path.join(REPO_DIR, "enhanced_unified_manager.py")],
+                                cwd=REPO_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+    try:
+        assert wait_until_serving(url, proc) == 200
+        # No reloader child: the signalled process is the one answering requests
+        with open(f"/proc/{proc.pid}/task/{proc.pid}/children") as f:
+            assert f.read().split() == []
+
+        proc.send_signal(signal.SIGHUP)
+        deadline = time.monotonic() + 10
+        while b"keys will be reloaded" not in log_path.read_bytes():
+            assert time.monotonic() < deadline, log_path.read_text()
+            time.sleep(0.1)
+        assert proc.poll() is None
+        assert wait_until_serving(url, proc) == 200
+    finally:
+        proc.terminate()
+        proc.wait(10)
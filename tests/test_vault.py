@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+In-process Ansible Vault 1.1 AES256: interoperability with ansible-vault, HMAC checks and the derived-key cache
+"""
+
+import os
+
+import pytest
+
+import enhanced_unified_manager as lockr
+
+VAULT_PASSWORD = b"lockr-test-vault-password"
+PLAINTEXT = b"S3cure!Passw0rd-{}|<>"
+
+# `ansible-vault encrypt` (ansible-core 2.19) of PLAINTEXT with VAULT_PASSWORD
+ANSIBLE_VAULTTEXT = b"""$ANSIBLE_VAULT;1.1;AES256
+62626630373865333736633635363966396263323834346235336135663366356335373963633339
+6439623266613732643665326138366435626235363433330a306131376531633637643134323337
+62393463366139643364663934636431356366356535663436653736383364666135626565366435
+6235326231343266340a363335323566346430326664623937366566666362333064396535343762
+64343037376162646639663838336565386138663833396130363739663432316464
+"""
+
+
+@pytest.fixture
+def vault_key(tmp_path, monkeypatch):
+    """Write VAULT_PASSWORD to a fresh VAULT_KEY and return a function that replaces it"""
+    path = tmp_path / ".vault_key"
+    monkeypatch.setattr(lockr, "VAULT_KEY", str(path))
+    monkeypatch.setattr(lockr, "VAULT_BACKEND", "cryptography")
+
+    def write(password):
+        path.write_bytes(password + b"\n")
+        # A new mtime, as a real key rotation would have
+        st = path.stat()
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+
+    write(VAULT_PASSWORD)
+    lockr.clear_vault_cache()
+    yield write
+    lockr.clear_vault_cache()
+
+
+def test_decrypts_ansible_vault_ciphertext(vault_key):
+    assert lockr.decrypt_vault_text(ANSIBLE_VAULTTEXT) == PLAINTEXT
+
+
+def test_encrypt_round_trip(vault_key):
+    vaulttext = lockr.encrypt_vault_text(PLAINTEXT)
+    lines = vaulttext.splitlines()
+    assert lines[0] == lockr.VAULT_HEADER
+    assert all(len(line) <= 80 for line in lines[1:])
+    assert lockr.decrypt_vault_text(vaulttext) == PLAINTEXT
+    # A fresh salt each time
+    assert lockr.encrypt_vault_text(PLAINTEXT) != vaulttext
+
+
+def test_ansible_decrypts_our_ciphertext(vault_key):
+    vault = pytest.importorskip("ansible.parsing.vault")
+    vault_lib = vault.VaultLib([("default", vault.VaultSecret(VAULT_PASSWORD))])
+    assert vault_lib.decrypt(lockr.encrypt_vault_text(PLAINTEXT)) == PLAINTEXT
+
+
+def test_wrong_password_fails_hmac(vault_key):
+    vault_key(b"not-the-vault-password")
+    with pytest.raises(ValueError, match="HMAC"):
+        lockr.decrypt_vault_text(ANSIBLE_VAULTTEXT)
+
+
+def test_tampered_ciphertext_fails_hmac(vault_key):
+    lines = ANSIBLE_VAULTTEXT.splitlines()
+    last = lines[-1]
+    lines[-1] = last[:-1] + (b"5" if last[-1:] != b"5" else b"6")
+    with pytest.raises(ValueError, match="HMAC"):
+        lockr.decrypt_vault_text(b"\n".join(lines))
+
+
+def test_rejects_other_formats(vault_key):
+    with pytest.raises(ValueError, match="Unsupported"):
+        lockr.decrypt_vault_text(b"$ANSIBLE_VAULT;1.1;AES\n00")
+
+
+def test_derived_keys_are_reused_per_file(vault_key, tmp_path, monkeypatch):
+    # No plaintext cache, so each read decrypts again
+    monkeypatch.setattr(lockr, "VAULT_CACHE_TTL", 0)
+    path = tmp_path / "entry.vault"
+    path.write_bytes(ANSIBLE_VAULTTEXT)
+
+    assert lockr.decrypt_vault_file(str(path)) == PLAINTEXT.decode()
+    assert lockr.decrypt_vault_file(str(path)) == PLAINTEXT.decode()
+    info = lockr.derive_file_vault_keys.cache_info()
+    assert (info.misses, info.hits) == (1, 1)
+
+
+def test_rotated_vault_key_is_not_served_from_the_cache(vault_key, tmp_path, monkeypatch):
+    monkeypatch.setattr(lockr, "VAULT_CACHE_TTL", 0)
+    path = tmp_path / "entry.vault"
+    path.write_bytes(ANSIBLE_VAULTTEXT)
+    assert lockr.decrypt_vault_file(str(path)) == PLAINTEXT.decode()
+
+    vault_key(b"a-rotated-vault-password")
+    with pytest.raises(ValueError, match="HMAC"):
+        lockr.decrypt_vault_file(str(path))
+
+
+def test_new_entry_is_read_without_a_second_derivation(vault_key, tmp_path, monkeypatch):
+    monkeypatch.setattr(lockr, "VAULT_CACHE_TTL", 0)
+    path = tmp_path / "entry.vault"
+    path.write_bytes(lockr.encrypt_vault_text(PLAINTEXT))
+
+    assert lockr.decrypt_vault_file(str(path)) == PLAINTEXT.decode()
+    info = lockr.derive_file_vault_keys.cache_info()
+    assert (info.misses, info.hits) == (1, 1)
@@ -0,0 +1,10 @@
+#!/usr/bin/env python3
+"""
+Lockr WSGI Entry Point
+Used by gunicorn (see gunicorn_conf.py); runs one-time startup work on import
+"""
+
+# gevent workers monkey-patch the standard library themselves, in each worker after the fork
+from enhanced_unified_manager import app, init_app
+
+init_app()